@@ -0,0 +1,117 @@
+import os
+import threading
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from ring_buffer import RingBuffer
+
+
+class AnomalyDetector:
+    # StandardScaler + IsolationForest, fit once, saved to disk and loaded on first use.
+    # Scoring never refits; a background thread can refit on a sliding window of recent rows
+    # and swap the new model in atomically.
+    def __init__(self, model_path="anomaly_detector.joblib", table="equipment_data", feature_columns=("efficiency", "temperature"),
+                 contamination=0.1, window=100000, min_refit_rows=1000, random_state=42):
+        self.model_path = model_path
+        self.table = table
+        self.feature_columns = list(feature_columns)
+        self.contamination = contamination
+        self.min_refit_rows = min_refit_rows
+        self.random_state = random_state
+        self.window = RingBuffer(window, channels=len(self.feature_columns))
+        self.high_water_mark = 0
+        self._model = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refit_thread = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None and os.path.exists(self.model_path):
+                    self._model = joblib.load(self.model_path)
+        if self._model is None:
+            raise RuntimeError(f"No anomaly model at {self.model_path}; call fit() first")
+        return self._model
+
+    def fit(self, X):
+        
+        model = make_pipeline(
+            StandardScaler(),
+            IsolationForest(contamination=self.contamination, random_state=self.random_state),
+        )
+        model.fit(np.asarray(X, dtype=np.float64))
+        # Write then rename so a reader never loads a half-written file.
+        temporary_path = f"{self.model_path}.tmp"
+        joblib.dump(model, temporary_path)
+        os.replace(temporary_path, self.model_path)
+        with self._lock:
+            self._model = model
+        return model
+
+    def score_batch(self, X):
+        
+        # One score_samples pass gives both the scores and the labels
+        # (IsolationForest.predict is score_samples - offset_ thresholded at 0).
+        X = np.asarray(X, dtype=np.float64)
+        model = self.model
+        scores = model.score_samples(X)
+        labels = np.where(scores - model[-1].offset_ < 0, -1, 1)
+        # The refit thread snapshots the window under the same lock, so it never sees a half-written block.
+        with self._lock:
+            self.window.extend(X.T)
+        return scores, labels
+
+    def fetch_rows(self, db, limit=100000):
+        
+        columns = ", ".join(self.feature_columns)
+        rows = db.cursor.execute(f'''
+        SELECT id, {columns} FROM {self.table} WHERE id > ? ORDER BY id LIMIT ?''', (self.high_water_mark, limit)).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(self.feature_columns)))
+        data = np.array(rows, dtype=np.float64)
+        return data[:, 0].astype(np.int64), data[:, 1:]
+
+    def score_new_rows(self, db, batch_size=100000):
+        
+        # Scores every row added since the last call, in micro-batches of batch_size.
+        ids, scores, labels = [], [], []
+        while True:
+            batch_ids, X = self.fetch_rows(db, batch_size)
+            if len(batch_ids) == 0:
+                break
+            batch_scores, batch_labels = self.score_batch(X)
+            ids.append(batch_ids)
+            scores.append(batch_scores)
+            labels.append(batch_labels)
+            self.high_water_mark = int(batch_ids[-1])
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64)
+        return np.concatenate(ids), np.concatenate(scores), np.concatenate(labels)
+
+    def refit_from_window(self):
+        
+        with self._lock:
+            if len(self.window) < self.min_refit_rows:
+                return None
+            X = self.window.view().T.copy()
+        return self.fit(X)
+
+    def start_background_refit(self, interval=3600.0):
+        
+        def loop():
+            while not self._stop.wait(interval):
+                self.refit_from_window()
+
+        self._stop.clear()
+        self._refit_thread = threading.Thread(target=loop, name="anomaly-refit", daemon=True)
+        self._refit_thread.start()
+
+    def stop_background_refit(self):
+        self._stop.set()
+        if self._refit_thread is not None:
+            self._refit_thread.join()
+            self._refit_thread = None
@@ -1,81 +1,118 @@
+import argparse
+import os
 import pybullet as p
-import time
-import pybullet_data
 import numpy as np
 import gym
 from stable_baselines3 import PPO
-
-physicsClient = p.connect(p.GUI)
-p.setGravity(0, 0, -9.8)  
-p.setAdditionalSearchPath(pybullet_data.getDataPath())  
-
-planeId = p.loadURDF("plane.urdf")  
-robotId = p.loadURDF("kuka_iiwa/model.urdf", basePosition=[0, 0, 0.5])  
-boxId = p.loadURDF("r2d2.urdf", basePosition=[0.5, 0, 0.5])  
-
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+from simulation_runner import JointGroup, SimulationRunner, headless_requested
 
 time_step = 0.01
-p.setTimeStep(time_step)
-p.setRealTimeSimulation(1)  
 
 class RoboticArmEnv(gym.Env):
-    def __init__(self):
+    # Each instance owns its own PyBullet client, so several can run side by side in worker processes.
+    def __init__(self, gui=False, time_step=time_step, action_repeat=1, max_steps=500):
         super(RoboticArmEnv, self).__init__()
 
+        self.runner = SimulationRunner(gui=gui, time_step=time_step, real_time=gui)
+        self.client = self.runner.client
+        self.planeId = self.runner.load("plane.urdf")
+        self.robotId = self.runner.load("kuka_iiwa/model.urdf", [0, 0, 0.5])
+        self.boxId = self.runner.load("r2d2.urdf", [0.5, 0, 0.5])
+        self.arm_joints = JointGroup(self.client, self.robotId)
+
+        self.action_repeat = action_repeat
+        self.max_steps = max_steps
+
         self.action_space = gym.spaces.Box(low=-2.0, high=2.0, shape=(7,), dtype=np.float32)
 
-        self.observation_space = gym.spaces.Box(low=-5.0, high=5.0, shape=(14,), dtype=np.float32)
+        # 7 joint positions followed by the box position.
+        self.observation_space = gym.spaces.Box(low=-5.0, high=5.0, shape=(10,), dtype=np.float32)
+        # Scratch buffer filled in place by get_state(); reset()/step() hand out copies, since VecEnvs
+        # keep the terminal observation around across the following reset().
+        self.observation = np.zeros(self.observation_space.shape, dtype=np.float32)
 
         self.step_count = 0
 
     def reset(self):
        
-        p.resetBasePositionAndOrientation(robotId, [0, 0, 0.5], [0, 0, 0, 1]) 
-        p.resetBasePositionAndOrientation(boxId, [0.5, 0, 0.5], [0, 0, 0, 1])  
+        p.resetBasePositionAndOrientation(self.robotId, [0, 0, 0.5], [0, 0, 0, 1], physicsClientId=self.client)
+        p.resetBasePositionAndOrientation(self.boxId, [0.5, 0, 0.5], [0, 0, 0, 1], physicsClientId=self.client)
         self.step_count = 0
         return self.get_state()
 
     def step(self, action):
         self.step_count += 1
 
-        for i in range(p.getNumJoints(robotId)):
-            p.setJointMotorControl2(robotId, i, p.POSITION_CONTROL, targetPosition=action[i])
+        self.arm_joints.set_positions(action)
 
-        p.stepSimulation()
+        # Frame skip: hold the same motor targets for action_repeat physics steps.
+        for _ in range(self.action_repeat):
+            self.runner.step()
 
         state = self.get_state()
 
-        reward = -np.linalg.norm(np.array(state[:3]) - np.array(state[7:10]))  
+        reward = -float(np.linalg.norm(state[:3] - state[7:10]))
 
-        done = self.step_count > 500 or reward > -0.1  
+        done = self.step_count > self.max_steps or reward > -0.1  
 
         return state, reward, done, {}
 
     def get_state(self):
      
-        joint_positions = [p.getJointState(robotId, i)[0] for i in range(p.getNumJoints(robotId))]
+        self.arm_joints.read_positions(self.observation[:7])
 
-        box_position, _ = p.getBasePositionAndOrientation(boxId)
+        box_position, _ = p.getBasePositionAndOrientation(self.boxId, physicsClientId=self.client)
 
-        state = joint_positions + list(box_position)
-        return state
+        self.observation[7:10] = box_position
+        return self.observation.copy()
 
     def render(self):
 
         pass
 
-env = RoboticArmEnv()
+    def close(self):
+        self.runner.disconnect()
+
+
+def make_env(**env_kwargs):
+    
+    def _init():
+        return RoboticArmEnv(**env_kwargs)
+    return _init
+
+
+def make_vec_env(num_envs, **env_kwargs):
+    
+    env_fns = [make_env(**env_kwargs) for _ in range(num_envs)]
+    if num_envs == 1:
+        return DummyVecEnv(env_fns)
+    return SubprocVecEnv(env_fns, start_method="spawn")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--num-envs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--action-repeat", type=int, default=1)
+    parser.add_argument("--total-timesteps", type=int, default=100000)
+    args = parser.parse_args()
+
+    env = make_vec_env(args.num_envs, action_repeat=args.action_repeat)
 
-model = PPO('MlpPolicy', env, verbose=1)
-model.learn(total_timesteps=100000)
+    # Keep roughly the default 2048-sample rollout regardless of how many envs share it.
+    model = PPO('MlpPolicy', env, n_steps=max(2048 // args.num_envs, 64), verbose=1)
+    model.learn(total_timesteps=args.total_timesteps)
 
-model.save("robotic_arm_ppo")
+    model.save("robotic_arm_ppo")
+    env.close()
 
-obs = env.reset()
-for _ in range(1000):
-    action, _states = model.predict(obs)
-    obs, reward, done, info = env.step(action)
-    if done:
-        break
+    eval_env = RoboticArmEnv(gui=not headless_requested(), action_repeat=args.action_repeat)
+    obs = eval_env.reset()
+    for _ in range(1000):
+        action, _states = model.predict(obs)
+        obs, reward, done, info = eval_env.step(action)
+        if done:
+            break
 
-p.disconnect()
+    eval_env.close()
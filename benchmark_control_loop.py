@@ -0,0 +1,44 @@
+import contextlib
+import io
+import time
+
+from main import Database, DigitalTwinControl, IndustrialEquipment, Sensor
+
+SENSORS_PER_EQUIPMENT = 4
+
+
+def build_control(num_sensors):
+    equipment_list = []
+    sensors = []
+    for e in range(num_sensors // SENSORS_PER_EQUIPMENT):
+        equipment_id = f"{e:06d}"
+        # failure_rate=0 and a wide temperature band keep every machine running for the whole benchmark.
+        equipment_list.append(IndustrialEquipment(equipment_id, f"Machine {e}", max_capacity=1000, efficiency=0.9, failure_rate=0.0, failure_types=["overload"], operating_temp_range=(-1e9, 1e9)))
+        for s in range(SENSORS_PER_EQUIPMENT):
+            sensors.append(Sensor(f"S{e}-{s}", equipment_id, "Temperature", "°C", 10, 100))
+    return DigitalTwinControl(equipment_list, sensors, Database(":memory:"), None, None)
+
+
+def time_sweep(control, repeats=3, vectorized=False):
+    writer = control.db.buffered_writer(max_rows=float("inf"), max_age=float("inf"))
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            if vectorized:
+                control.run_vectorized_sweep(writer)
+            else:
+                control.run_sweep(writer)
+            best = min(best, time.perf_counter() - start)
+            writer.sensor_rows.clear()
+            writer.equipment_rows.clear()
+    return best
+
+
+if __name__ == "__main__":
+    print(f"{'sensors':>8} {'tick (ms)':>10} {'us/sensor':>10} {'vec (ms)':>10} {'us/sensor':>10}")
+    for num_sensors in (100, 1_000, 10_000, 100_000):
+        tick = time_sweep(build_control(num_sensors))
+        vectorized = time_sweep(build_control(num_sensors), vectorized=True)
+        print(f"{num_sensors:>8} {tick * 1e3:>10.2f} {tick / num_sensors * 1e6:>10.2f} "
+              f"{vectorized * 1e3:>10.2f} {vectorized / num_sensors * 1e6:>10.2f}")
@@ -0,0 +1,41 @@
+import time
+import numpy as np
+import pybullet as p
+from simulation_runner import JointGroup, SimulationRunner
+
+STEPS = 5000
+
+
+def per_joint_step(client, robot_id, targets):
+    for i in range(p.getNumJoints(robot_id, physicsClientId=client)):
+        p.setJointMotorControl2(robot_id, i, p.POSITION_CONTROL, targetPosition=targets[i], physicsClientId=client)
+    p.stepSimulation(physicsClientId=client)
+    return [p.getJointState(robot_id, i, physicsClientId=client)[0] for i in range(p.getNumJoints(robot_id, physicsClientId=client))]
+
+
+def batched_step(client, joints, targets):
+    joints.set_positions(targets)
+    p.stepSimulation(physicsClientId=client)
+    return joints.read_positions()
+
+
+def steps_per_second(step):
+    targets = np.zeros(7)
+    start = time.perf_counter()
+    for k in range(STEPS):
+        targets[:] = 0.5 * np.sin(k * 0.01 * np.arange(1, 8))
+        step(targets)
+    return STEPS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    with SimulationRunner() as runner:
+        runner.load("plane.urdf")
+        robot_id = runner.load("kuka_iiwa/model.urdf", [0, 0, 0.5])
+        joints = JointGroup(runner.client, robot_id)
+
+        before = steps_per_second(lambda targets: per_joint_step(runner.client, robot_id, targets))
+        after = steps_per_second(lambda targets: batched_step(runner.client, joints, targets))
+
+    print(f"per-joint calls : {before:10.0f} steps/s")
+    print(f"array calls     : {after:10.0f} steps/s ({after / before:.2f}x)")
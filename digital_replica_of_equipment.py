@@ -1,77 +1,69 @@
 import pybullet as p
-import time
-import pybullet_data
 import numpy as np
+from simulation_runner import JointGroup, runner_from_argv
+from trajectory_recorder import TrajectoryRecorder
+from collision_monitor import CollisionMonitor
 
-physicsClient = p.connect(p.GUI)
-p.setGravity(0, 0, -9.8)  
+time_step = 0.01
+runner = runner_from_argv(time_step)
+client = runner.client
 
-p.setAdditionalSearchPath(pybullet_data.getDataPath())  
+planeId = runner.load("plane.urdf")
+robotId = runner.load("kuka_iiwa/model.urdf", [0, 0, 0.5])
+arm_joints = JointGroup(client, robotId)
+boxId = runner.load("r2d2.urdf", [1, 0, 0.5])
 
-planeId = p.loadURDF("plane.urdf")  
-robotId = p.loadURDF("kuka_iiwa/model.urdf", basePosition=[0, 0, 0.5])  
-boxId = p.loadURDF("r2d2.urdf", basePosition=[1, 0, 0.5])  
+conveyorId = runner.load("cube.urdf", [2, 0, 0.5], globalScaling=2)
+collision_monitor = CollisionMonitor(client, [(robotId, boxId), (robotId, conveyorId), (boxId, conveyorId)])
 
-conveyorId = p.loadURDF("cube.urdf", basePosition=[2, 0, 0.5], globalScaling=2)
 
-time_step = 0.01  
-p.setTimeStep(time_step)
-p.setRealTimeSimulation(1)  
-
-
-joint_positions_log = []
+joint_positions_log = TrajectoryRecorder(len(arm_joints))
 target_positions_log = []
 
 def control_robot_arm(target_joint_positions):
-    for i in range(p.getNumJoints(robotId)):
-        p.setJointMotorControl2(robotId, i, p.POSITION_CONTROL, targetPosition=target_joint_positions[i])
+    arm_joints.set_positions(target_joint_positions)
 
-def control_conveyor():
-    conveyor_position = np.sin(time.time()) * 0.5  
-    p.resetBasePositionAndOrientation(conveyorId, [2 + conveyor_position, 0, 0.5], [0, 0, 0, 1])
+def control_conveyor(t):
+    conveyor_position = np.sin(t) * 0.5
+    p.resetBasePositionAndOrientation(conveyorId, [2 + conveyor_position, 0, 0.5], [0, 0, 0, 1], physicsClientId=client)
 
-def detect_collisions():
-    contact_points = p.getContactPoints()
-    if contact_points:
-        for contact in contact_points:
-            print(f"Collision detected: {contact}")
+def detect_collisions(t, step):
+    collision_monitor.check(step, t)
 
 def log_joint_positions():
-    joint_positions = []
-    for i in range(p.getNumJoints(robotId)):
-        joint_state = p.getJointState(robotId, i)
-        joint_positions.append(joint_state[0])
-    joint_positions_log.append(joint_positions)
+    arm_joints.read_positions(out=joint_positions_log.next_row())
 
-def pick_up_box():
+def pick_up_box(t):
     
     approach_position = [0.7, 0, 0.5]
-    target_joint_positions = [0.5 * np.sin(time.time() * 0.1),  
-                              -1.0 * np.cos(time.time() * 0.2), 
-                              1.0 * np.sin(time.time() * 0.3),  
-                              -1.5 * np.cos(time.time() * 0.4),  
-                              1.0 * np.sin(time.time() * 0.5),  
-                              -0.5 * np.cos(time.time() * 0.6),  
-                              0.2 * np.sin(time.time() * 0.7)]  
+    target_joint_positions = [0.5 * np.sin(t * 0.1),
+                              -1.0 * np.cos(t * 0.2),
+                              1.0 * np.sin(t * 0.3),
+                              -1.5 * np.cos(t * 0.4),
+                              1.0 * np.sin(t * 0.5),
+                              -0.5 * np.cos(t * 0.6),
+                              0.2 * np.sin(t * 0.7)]
 
     control_robot_arm(target_joint_positions)
 
-for step in range(5000):  
+def simulation_step(t, step):
  
-    pick_up_box()
+    pick_up_box(t)
 
-    control_conveyor()
+    control_conveyor(t)
 
     log_joint_positions()
 
-    detect_collisions()
+    detect_collisions(t, step)
 
-    p.stepSimulation()
+runner.run(5000, simulation_step)
 
-    time.sleep(time_step)
+print(f"Collision events: {collision_monitor.summary()}")
+for event in collision_monitor.events()[:5]:
+    print(event)
 
 print("Logged joint positions during simulation:")
-for i, positions in enumerate(joint_positions_log[:5]):  
+for i, positions in enumerate(joint_positions_log.head(5).tolist()):  
     print(f"Step {i}: {positions}")
 
-p.disconnect()
+runner.disconnect()
@@ -1,30 +1,59 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from energy_analytics import EnergyAnalytics
 
-np.random.seed(42)
 
-days = np.arange(1, 31)
-normal_consumption = np.random.normal(50, 10, 30)  
-peak_consumption = np.random.normal(70, 15, 30)    
+def simulate_meter(normal_consumption, peak_consumption, start="2024-01-01", rng=None):
+    # Second-resolution power (kW) whose daily energy matches normal_consumption, with the
+    # extra energy of peak_consumption delivered in a two-hour afternoon burst.
+    rng = np.random.default_rng() if rng is None else rng
+    seconds_of_day = np.arange(86400)
+    burst = (seconds_of_day >= 14 * 3600) & (seconds_of_day < 16 * 3600)
+    base_kw = np.repeat(normal_consumption / 24, 86400)
+    extra_kw = np.maximum(peak_consumption - normal_consumption, 0)[:, None] / 2 * burst
+    power_kw = base_kw + extra_kw.ravel() + rng.normal(0, 0.2, base_kw.size)
+    timestamps = np.datetime64(start) + np.arange(base_kw.size).astype("timedelta64[s]")
+    return timestamps, np.maximum(power_kw, 0)
 
-peak_days = np.random.choice(days, size=5, replace=False)
-peak_consumption[peak_days] += 20  
 
-plt.figure(figsize=(10, 6))
-plt.plot(days, normal_consumption, label="Normal Consumption", color="blue")
-plt.plot(days, peak_consumption, label="Peak Consumption", color="red", linestyle="--")
-plt.fill_between(days, normal_consumption, peak_consumption, color="gray", alpha=0.3)
-plt.title("Energy Consumption Analysis")
-plt.xlabel("Day")
-plt.ylabel("Energy (kWh)")
-plt.legend()
-plt.show()
+if __name__ == "__main__":
+    np.random.seed(42)
 
-avg_consumption = np.mean(normal_consumption)
-peak_avg = np.mean(peak_consumption)
+    days = np.arange(1, 31)
+    normal_consumption = np.random.normal(50, 10, 30)
+    peak_consumption = np.random.normal(70, 15, 30)
 
-print(f"Average Normal Consumption: {avg_consumption:.2f} kWh")
-print(f"Average Peak Consumption: {peak_avg:.2f} kWh")
+    peak_days = np.random.choice(days, size=5, replace=False)
+    peak_consumption[peak_days - 1] += 20
 
-if peak_avg > avg_consumption + 15:
-    print("Energy optimization suggested: Peak consumption is higher than expected.")
+    timestamps, power_kw = simulate_meter(normal_consumption, peak_consumption, rng=np.random.default_rng(42))
+    analytics = EnergyAnalytics(sample_seconds=1.0)
+    for start in range(0, len(power_kw), 3600):
+        analytics.ingest("001", timestamps[start:start + 3600], power_kw[start:start + 3600])
+
+    daily = analytics.rollup("001", "day")
+    daily_peak = analytics.demand_15min("001").resample("D").max()
+    load_factor = analytics.load_factor("001", "day")
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(days, normal_consumption, label="Normal Consumption", color="blue")
+    plt.plot(days, peak_consumption, label="Peak Consumption", color="red", linestyle="--")
+    plt.plot(days, daily["energy_kwh"], label="Metered Consumption", color="green", alpha=0.7)
+    plt.fill_between(days, normal_consumption, peak_consumption, color="gray", alpha=0.3)
+    plt.title("Energy Consumption Analysis")
+    plt.xlabel("Day")
+    plt.ylabel("Energy (kWh)")
+    plt.legend()
+    plt.show()
+
+    avg_consumption = np.mean(normal_consumption)
+    peak_avg = np.mean(peak_consumption)
+
+    print(f"Average Normal Consumption: {avg_consumption:.2f} kWh")
+    print(f"Average Peak Consumption: {peak_avg:.2f} kWh")
+    print(f"Metered Consumption (30 days): {daily['energy_kwh'].sum():.2f} kWh")
+    print(f"Peak 15-min Demand: {daily_peak.max():.2f} kW (day {daily_peak.argmax() + 1})")
+    print(f"Average Daily Load Factor: {load_factor.mean():.2f}")
+
+    if peak_avg > avg_consumption + 15:
+        print("Energy optimization suggested: Peak consumption is higher than expected.")
@@ -0,0 +1,166 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = {"15min": 900, "hour": 3600, "day": 86400}
+
+BUCKET_DTYPE = np.dtype([
+    ("bucket", np.int64),
+    ("energy_kwh", np.float64),
+    ("max_kw", np.float64),
+    ("samples", np.int64),
+])
+
+
+class EnergyAnalytics:
+    # Per-equipment power readings (kW, ~1 s apart) are rolled up into 15-min, hourly and daily
+    # buckets as they arrive. Each (resolution, equipment) keeps a bucket-sorted structured array;
+    # a new chunk is aggregated with bincount and merged in place, so dashboards read the
+    # pre-rolled buckets and raw readings never need to be kept. With a main.Database the buckets
+    # and the sensor_data high-water mark are also upserted into the energy_rollup_* tables and
+    # reloaded on start, so a restart resumes instead of re-reading history and other processes
+    # can query the tables directly.
+    def __init__(self, sample_seconds=1.0, db=None):
+        self.sample_seconds = sample_seconds
+        self.db = db
+        self.rollups = {resolution: {} for resolution in RESOLUTIONS}
+        self.high_water_mark = 0
+        if db is not None:
+            self._load()
+
+    def _load(self):
+        for resolution in RESOLUTIONS:
+            rows = self.db.cursor.execute(f'''
+            SELECT equipment_id, bucket, energy_kwh, max_kw, samples FROM energy_rollup_{resolution}
+            ORDER BY equipment_id, bucket''').fetchall()
+            for equipment_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+                buckets = np.array([row[1:] for row in group], dtype=BUCKET_DTYPE)
+                buckets["bucket"] //= RESOLUTIONS[resolution]
+                self.rollups[resolution][equipment_id] = buckets
+        row = self.db.cursor.execute("SELECT high_water_mark FROM rollup_state WHERE source = 'energy'").fetchone()
+        self.high_water_mark = row[0] if row else 0
+
+    def ingest(self, equipment_id, timestamps, power_kw):
+        
+        # timestamps: datetime64 array or epoch seconds.
+        chunks = self._ingest(equipment_id, timestamps, power_kw)
+        if self.db is not None and chunks:
+            with self.db.connection:
+                self._store(equipment_id, chunks)
+
+    def _ingest(self, equipment_id, timestamps, power_kw):
+        timestamps = np.asarray(timestamps)
+        if len(timestamps) == 0:
+            return {}
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            seconds = timestamps.astype("datetime64[s]").astype(np.int64)
+        else:
+            seconds = timestamps.astype(np.int64)
+        power_kw = np.asarray(power_kw, dtype=np.float64)
+        energy_kwh = power_kw * (self.sample_seconds / 3600)
+        chunks = {}
+        for resolution, width in RESOLUTIONS.items():
+            bucket = seconds // width
+            first = bucket.min()
+            offset = bucket - first
+            size = offset.max() + 1
+            samples = np.bincount(offset, minlength=size)
+            present = np.flatnonzero(samples)
+            peaks = np.full(size, -np.inf)
+            np.maximum.at(peaks, offset, power_kw)
+            chunk = np.zeros(len(present), dtype=BUCKET_DTYPE)
+            chunk["bucket"] = present + first
+            chunk["energy_kwh"] = np.bincount(offset, weights=energy_kwh, minlength=size)[present]
+            chunk["max_kw"] = peaks[present]
+            chunk["samples"] = samples[present]
+            chunks[resolution] = chunk
+            self.rollups[resolution][equipment_id] = self._merge(self.rollups[resolution].get(equipment_id), chunk)
+        return chunks
+
+    def _store(self, equipment_id, chunks):
+        # Same upsert as main.RollupJob: combine with whatever the bucket already holds. Buckets are
+        # stored as epoch seconds of the bucket start, like the sensor_rollup_* tables.
+        for resolution, chunk in chunks.items():
+            chunk = chunk.copy()
+            chunk["bucket"] *= RESOLUTIONS[resolution]
+            self.db.cursor.executemany(f'''
+            INSERT INTO energy_rollup_{resolution} (equipment_id, bucket, energy_kwh, max_kw, samples) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (equipment_id, bucket) DO UPDATE SET
+                energy_kwh = energy_kwh + excluded.energy_kwh,
+                max_kw = MAX(max_kw, excluded.max_kw),
+                samples = samples + excluded.samples''', ((equipment_id, *row) for row in chunk.tolist()))
+
+    def _merge(self, stored, chunk):
+        if stored is None or len(stored) == 0:
+            return chunk.copy()
+        slots = np.searchsorted(stored["bucket"], chunk["bucket"])
+        clipped = np.minimum(slots, len(stored) - 1)
+        existing = stored["bucket"][clipped] == chunk["bucket"]
+        hit = clipped[existing]
+        stored["energy_kwh"][hit] += chunk["energy_kwh"][existing]
+        stored["samples"][hit] += chunk["samples"][existing]
+        np.maximum.at(stored["max_kw"], hit, chunk["max_kw"][existing])
+        fresh = chunk[~existing]
+        if len(fresh) == 0:
+            return stored
+        if fresh["bucket"][0] > stored["bucket"][-1]:
+            # The usual case for time-ordered streams: new buckets go on the end.
+            return np.concatenate([stored, fresh])
+        return np.insert(stored, slots[~existing], fresh)
+
+    def ingest_from_database(self, db, power_sensor_ids, batch_rows=100000):
+        
+        # Pulls new readings of the given power sensors from main.Database's sensor_data, batch_rows
+        # ids at a time; with persistence each batch and the high-water mark commit together.
+        placeholders = ", ".join("?" * len(power_sensor_ids))
+        ingested = 0
+        while True:
+            upto = db.cursor.execute('''
+            SELECT MAX(id) FROM (SELECT id FROM sensor_data WHERE id > ? ORDER BY id LIMIT ?)''', (self.high_water_mark, batch_rows)).fetchone()[0]
+            if upto is None:
+                break
+            rows = db.cursor.execute(f'''
+            SELECT equipment_id, CAST(strftime('%s', timestamp) AS INTEGER), value FROM sensor_data
+            WHERE id > ? AND id <= ? AND sensor_id IN ({placeholders}) ORDER BY id''', (self.high_water_mark, upto, *power_sensor_ids)).fetchall()
+            frame = pd.DataFrame(rows, columns=["equipment_id", "seconds", "power_kw"])
+            chunks = {equipment_id: self._ingest(equipment_id, group["seconds"].to_numpy(), group["power_kw"].to_numpy())
+                      for equipment_id, group in frame.groupby("equipment_id", sort=False)}
+            self.high_water_mark = upto
+            if self.db is not None:
+                with self.db.connection:
+                    for equipment_id, equipment_chunks in chunks.items():
+                        self._store(equipment_id, equipment_chunks)
+                    self.db.cursor.execute('''
+                    INSERT INTO rollup_state (source, high_water_mark) VALUES ('energy', ?)
+                    ON CONFLICT (source) DO UPDATE SET high_water_mark = excluded.high_water_mark''', (upto,))
+            ingested += len(frame)
+        return ingested
+
+    def rollup(self, equipment_id, resolution="hour"):
+        buckets = self.rollups[resolution].get(equipment_id, np.zeros(0, dtype=BUCKET_DTYPE))
+        hours = buckets["samples"] * self.sample_seconds / 3600
+        return pd.DataFrame({
+            "start": (buckets["bucket"] * RESOLUTIONS[resolution]).astype("datetime64[s]"),
+            "energy_kwh": buckets["energy_kwh"],
+            "mean_kw": np.divide(buckets["energy_kwh"], hours, out=np.zeros(len(buckets)), where=hours > 0),
+            "max_kw": buckets["max_kw"],
+            "samples": buckets["samples"],
+        })
+
+    def demand_15min(self, equipment_id):
+        # Average demand per 15-minute interval, as billed by most utilities, on a gap-free grid.
+        quarters = self.rollup(equipment_id, "15min").set_index("start")["mean_kw"]
+        if quarters.empty:
+            return quarters
+        return quarters.asfreq("15min", fill_value=0.0)
+
+    def rolling_peak_demand(self, equipment_id, window="30D"):
+        return self.demand_15min(equipment_id).rolling(window).max()
+
+    def load_factor(self, equipment_id, resolution="day"):
+        # Mean demand over each period divided by that period's peak 15-minute demand.
+        demand = self.demand_15min(equipment_id)
+        width = {"hour": "h", "day": "D"}[resolution]
+        grouped = demand.resample(width)
+        peak = grouped.max()
+        return (grouped.mean() / peak.where(peak > 0)).rename("load_factor")
@@ -1,6 +1,7 @@
 import random
 import numpy as np
 import matplotlib.pyplot as plt
+from ring_buffer import RingBuffer
 
 class EquipmentHealthMonitor:
     def __init__(self):
@@ -24,18 +25,17 @@ class EquipmentHealthMonitor:
 monitor = EquipmentHealthMonitor()
 
 
-temps = []
-vibs = []
-usage = []
+# Channels: temperature, vibration, usage hours.
+history = RingBuffer(100, channels=3)
 status = []
 
 for _ in range(100):
     temp, vib, use, stat = monitor.update_data()
-    temps.append(temp)
-    vibs.append(vib)
-    usage.append(use)
+    history.append((temp, vib, use))
     status.append(stat)
 
+temps, vibs, usage = history.view()
+
 plt.figure(figsize=(10, 6))
 plt.subplot(3, 1, 1)
 plt.plot(temps, label="Temperature")
@@ -1,7 +1,8 @@
+import os
+import tempfile
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+from anomaly_service import AnomalyDetector
 
 np.random.seed(42)
 
@@ -11,13 +12,13 @@ anomalous_data = np.random.normal(5, 1, (10, 2))
 
 data = np.vstack([normal_data, anomalous_data])
 
-scaler = StandardScaler()
-data_scaled = scaler.fit_transform(data)
+# The demo model lives in a throwaway directory; fit() keeps it in memory for scoring.
+with tempfile.TemporaryDirectory() as model_dir:
+    detector = AnomalyDetector(model_path=os.path.join(model_dir, "anomaly_detector.joblib"), contamination=0.1, random_state=42)
+    detector.fit(data)
 
-model = IsolationForest(contamination=0.1, random_state=42)
-model.fit(data_scaled)
-
-predictions = model.predict(data_scaled)
+scores, predictions = detector.score_batch(data)
+data_scaled = detector.model[0].transform(data)
 
 plt.figure(figsize=(10, 6))
 
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+
+class RollingFeaturePipeline:
+    # Rolling mean/std/slope/peak-to-peak per sensor over several window lengths (in samples),
+    # computed from main.Database's sensor_data. Only rows past the high-water mark are read;
+    # the last max(windows) - 1 rows of each sensor are carried over so windows that straddle
+    # two runs come out exactly as in a full recompute. Finished features are appended to a
+    # SQLite table, so a restarted pipeline also resumes where it stopped.
+    def __init__(self, db, windows=(10, 60, 300), table="sensor_features", persist=True):
+        self.db = db
+        self.windows = sorted(windows)
+        self.table = table
+        self.persist = persist
+        self.frames = []  # in-memory feature history, only used when persist=False
+        self.tails = pd.DataFrame(columns=["id", "sensor_id", "equipment_id", "value", "timestamp"])
+        self.high_water_mark = 0
+        if persist:
+            self._resume()
+
+    @property
+    def feature_columns(self):
+        return [f"{stat}_{window}" for window in self.windows for stat in ("mean", "std", "slope", "ptp")]
+
+    def _resume(self):
+        exists = self.db.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)).fetchone()
+        if not exists:
+            return
+        self.high_water_mark = self.db.cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table}").fetchone()[0]
+        # Rebuild the carried-over tails from the raw rows just below the high-water mark.
+        self.tails = pd.read_sql_query(f'''
+        SELECT id, sensor_id, equipment_id, value, timestamp FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY sensor_id ORDER BY id DESC) AS rank
+            FROM sensor_data WHERE id <= ?
+        ) WHERE rank < ? ORDER BY id''', self.db.connection, params=(self.high_water_mark, self.windows[-1]))
+
+    def update(self, chunk_rows=1000000):
+        
+        # Returns the feature rows produced for readings that arrived since the last call.
+        produced = []
+        while True:
+            new_rows = pd.read_sql_query('''
+            SELECT id, sensor_id, equipment_id, value, timestamp FROM sensor_data
+            WHERE id > ? ORDER BY id LIMIT ?''', self.db.connection, params=(self.high_water_mark, chunk_rows))
+            if new_rows.empty:
+                break
+            features = self.compute(new_rows)
+            produced.append(features)
+            self.high_water_mark = int(new_rows["id"].iloc[-1])
+            if self.persist:
+                features.to_sql(self.table, self.db.connection, if_exists="append", index=False)
+                self.db.connection.commit()
+        if not produced:
+            return pd.DataFrame(columns=["id", "sensor_id", "equipment_id", "timestamp"] + self.feature_columns)
+        if not self.persist:
+            # With persist=True features() reads the table, so nothing is kept in memory.
+            self.frames.extend(produced)
+        return pd.concat(produced, ignore_index=True)
+
+    def compute(self, new_rows):
+        combined = pd.concat([self.tails, new_rows], ignore_index=True) if len(self.tails) else new_rows
+        combined = combined.sort_values(["sensor_id", "id"], kind="stable", ignore_index=True)
+        values = combined["value"].to_numpy(dtype=np.float64)
+        position = combined.groupby("sensor_id", sort=False).cumcount().to_numpy()
+        is_new = combined["id"].to_numpy() > self.high_water_mark
+
+        # One rolling pass over the whole sensor-sorted column; windows that would reach back
+        # into a neighbouring sensor are exactly those with position < window - 1, and are masked.
+        series = pd.Series(values)
+        k = np.arange(len(values), dtype=np.float64)
+        weighted = pd.Series(k * values)
+        out = combined.loc[is_new, ["id", "sensor_id", "equipment_id", "timestamp"]].reset_index(drop=True)
+        for window in self.windows:
+            rolling = series.rolling(window)
+            total = rolling.sum().to_numpy()
+            # Least-squares slope per sample over the window, from rolling sums of y and k*y.
+            k_mean = k - (window - 1) / 2
+            slope = (weighted.rolling(window).sum().to_numpy() - k_mean * total) / (window * (window ** 2 - 1) / 12) if window > 1 else np.zeros(len(values))
+            stats = {
+                "mean": total / window,
+                "std": rolling.std(ddof=0).to_numpy(),
+                "slope": slope,
+                "ptp": rolling.max().to_numpy() - rolling.min().to_numpy(),
+            }
+            invalid = position < window - 1
+            for stat, column in stats.items():
+                column = np.where(invalid, np.nan, column)
+                out[f"{stat}_{window}"] = column[is_new]
+
+        self.tails = combined.groupby("sensor_id", sort=False).tail(self.windows[-1] - 1)[["id", "sensor_id", "equipment_id", "value", "timestamp"]]
+        return out.sort_values("id", ignore_index=True)
+
+    def features(self):
+        
+        if self.persist:
+            return pd.read_sql_query(f"SELECT * FROM {self.table} ORDER BY id", self.db.connection)
+        if not self.frames:
+            return pd.DataFrame(columns=["id", "sensor_id", "equipment_id", "timestamp"] + self.feature_columns)
+        return pd.concat(self.frames, ignore_index=True)
+
+    def feature_matrix(self, features=None):
+        
+        # One row per (equipment_id, timestamp), one column per sensor and feature
+        # (e.g. "S1_mean_60"), forward-filled within each equipment.
+        features = self.features() if features is None else features
+        wide = features.pivot_table(index=["equipment_id", "timestamp"], columns="sensor_id", values=self.feature_columns, aggfunc="last")
+        wide.columns = [f"{sensor}_{feature}" for feature, sensor in wide.columns]
+        wide = wide.sort_index(axis=1)
+        return wide.groupby(level="equipment_id").ffill()
+
+    def latest_features(self, features=None):
+        
+        # Most recent feature vector per equipment, e.g. to score the whole fleet at once.
+        return self.feature_matrix(features).groupby(level="equipment_id").last()
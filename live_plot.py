@@ -0,0 +1,86 @@
+import math
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def minmax_decimate(values, buckets):
+    
+    # Keeps each bucket's min and max so spikes survive downsampling to screen resolution.
+    n = len(values)
+    if buckets <= 0 or n <= 2 * buckets:
+        return np.arange(n), values
+    size = n // buckets
+    usable = size * buckets
+    start = n - usable
+    blocks = values[start:].reshape(buckets, size)
+    x = np.empty(2 * buckets)
+    y = np.empty(2 * buckets)
+    x[0::2] = x[1::2] = start + np.arange(buckets) * size + size / 2
+    y[0::2] = blocks.min(axis=1)
+    y[1::2] = blocks.max(axis=1)
+    return x, y
+
+
+class LivePlotRenderer:
+    def __init__(self, buffer, titles, labels=None, colors=None, ylims=None, ncols=1, max_points=None, figsize=(10, 8)):
+        self.buffer = buffer
+        channels = buffer.channels
+        nrows = math.ceil(channels / ncols)
+        self.fig, axes = plt.subplots(nrows, ncols, figsize=figsize, squeeze=False)
+        self.axes = axes.ravel()[:channels]
+        for ax in axes.ravel()[channels:]:
+            ax.set_visible(False)
+        labels = labels or titles
+        colors = colors or [None] * channels
+        ylims = ylims or [None] * channels
+        # Channels without a fixed ylim grow their limits to fit the data (see update).
+        self.autoscale = [ylim is None for ylim in ylims]
+
+        # Artists are created once; frames only swap line data.
+        self.lines = []
+        for ax, title, label, color, ylim in zip(self.axes, titles, labels, colors, ylims):
+            line, = ax.plot([], [], label=label, color=color, animated=True)
+            ax.set_title(title)
+            ax.set_ylabel(label)
+            ax.set_xlim(0, buffer.capacity)
+            if ylim is not None:
+                ax.set_ylim(ylim)
+            ax.legend(loc="upper right")
+            self.lines.append(line)
+        self.fig.tight_layout()
+
+        if max_points is None:
+            # One min/max pair per horizontal pixel is all the screen can show.
+            max_points = int(max(ax.bbox.width for ax in self.axes))
+        self.buckets = max_points // 2
+
+    def init(self):
+        for line in self.lines:
+            line.set_data([], [])
+        return self.lines
+
+    def update(self, frame=None):
+        
+        window = self.buffer.view()
+        # Right-align the window so the newest sample is always at the right edge.
+        offset = self.buffer.capacity - window.shape[1]
+        rescaled = False
+        for ax, line, autoscale, values in zip(self.axes, self.lines, self.autoscale, window):
+            x, y = minmax_decimate(values, self.buckets)
+            line.set_data(x + offset, y)
+            if autoscale and len(y):
+                rescaled |= self._fit_ylim(ax, y.min(), y.max())
+        if rescaled:
+            # Blitting only repaints the lines, so new limits need one full redraw for the axes and
+            # ticks; the animation then re-caches its background for the changed view.
+            self.fig.canvas.draw()
+        return self.lines
+
+    def _fit_ylim(self, ax, low, high):
+        bottom, top = ax.get_ylim()
+        if bottom <= low and high <= top:
+            return False
+        # Refit to the data with a 10% margin, so slow drift doesn't force a redraw every frame.
+        pad = 0.1 * (high - low) or 1.0
+        ax.set_ylim(low - pad, high + pad)
+        return True
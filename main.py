@@ -3,14 +3,47 @@ import time
 import sqlite3
 import numpy as np
 import matplotlib.pyplot as plt
-from datetime import datetime
+from datetime import datetime, timezone
 import matplotlib.dates as mdates
-from sklearn.linear_model import LinearRegression
 import logging
 import threading
+import asyncio
+from scheduler import AsyncScheduler
+
+class _FleetField:
+    # Reads and writes through to the owning FleetState once the equipment is bound to one.
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        fleet = obj.__dict__.get("_fleet")
+        if fleet is None:
+            return obj.__dict__[self.name]
+        return fleet.get(self.name, obj._fleet_index)
+
+    def __set__(self, obj, value):
+        fleet = obj.__dict__.get("_fleet")
+        if fleet is None:
+            obj.__dict__[self.name] = value
+        else:
+            fleet.set(self.name, obj._fleet_index, value)
 
 class IndustrialEquipment:
+    max_capacity = _FleetField()
+    efficiency = _FleetField()
+    failure_rate = _FleetField()
+    current_capacity = _FleetField()
+    status = _FleetField()
+    operational_time = _FleetField()
+    downtime = _FleetField()
+    failure_count = _FleetField()
+    temperature = _FleetField()
+
     def __init__(self, id, name, max_capacity, efficiency, failure_rate, failure_types, location="Factory Floor", operating_temp_range=(0, 100)):
+        self._fleet = None
+        self._fleet_index = None
         self.id = id
         self.name = name
         self.max_capacity = max_capacity
@@ -78,6 +111,154 @@ class IndustrialEquipment:
             "Temperature (°C)": self.temperature
         }
 
+class FleetState:
+    STATUSES = ("operational", "failed")
+    FIELDS = {
+        "max_capacity": np.float64,
+        "efficiency": np.float64,
+        "failure_rate": np.float64,
+        "current_capacity": np.float64,
+        "status": np.int8,
+        "operational_time": np.int64,
+        "downtime": np.int64,
+        "failure_count": np.int64,
+        "temperature": np.float64,
+        "temp_low": np.float64,
+        "temp_high": np.float64,
+        "n_failure_types": np.int64,
+        "last_failure_type": np.int64,
+    }
+
+    def __init__(self, equipment_list=(), seed=None, capacity=64, log_events=True):
+        self.rng = np.random.default_rng(seed)
+        self.log_events = log_events
+        self.size = 0
+        self.equipment = []
+        self.arrays = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.FIELDS.items()}
+        for equipment in equipment_list:
+            self.add(equipment)
+
+    @classmethod
+    def from_arrays(cls, max_capacity, efficiency, failure_rate, temperature=20.0, operating_temp_range=(0, 100), n_failure_types=1, seed=None):
+        
+        # A fleet without IndustrialEquipment objects behind it, for bulk what-if runs.
+        max_capacity = np.asarray(max_capacity, dtype=np.float64)
+        n = len(max_capacity)
+        fleet = cls(seed=seed, capacity=max(n, 1), log_events=False)
+        columns = {
+            "max_capacity": max_capacity,
+            "efficiency": efficiency,
+            "failure_rate": failure_rate,
+            "temperature": temperature,
+            "temp_low": operating_temp_range[0],
+            "temp_high": operating_temp_range[1],
+            "n_failure_types": n_failure_types,
+            "last_failure_type": -1,
+        }
+        for name, values in columns.items():
+            fleet.arrays[name][:n] = values
+        fleet.equipment = [None] * n
+        fleet.size = n
+        return fleet
+
+    def __len__(self):
+        return self.size
+
+    def __getattr__(self, name):
+        # fleet.efficiency, fleet.temperature, ... are views over the live rows.
+        arrays = self.__dict__.get("arrays")
+        if arrays is None or name not in arrays:
+            raise AttributeError(name)
+        return arrays[name][:self.size]
+
+    def get(self, name, index):
+        value = self.arrays[name][index]
+        if name == "status":
+            return self.STATUSES[value]
+        if self.FIELDS[name] is np.float64:
+            return float(value)
+        return int(value)
+
+    def set(self, name, index, value):
+        if name == "status":
+            value = self.STATUSES.index(value)
+        self.arrays[name][index] = value
+
+    def add(self, equipment):
+        
+        if equipment._fleet is not None:
+            raise ValueError(f"Equipment {equipment.id} already belongs to a fleet")
+        if self.size == len(self.arrays["efficiency"]):
+            for name, array in self.arrays.items():
+                grown = np.zeros(2 * len(array), dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.arrays[name] = grown
+        index = self.size
+        for name in self.FIELDS:
+            if hasattr(type(equipment), name):
+                self.set(name, index, getattr(equipment, name))
+        self.arrays["temp_low"][index], self.arrays["temp_high"][index] = equipment.operating_temp_range
+        self.arrays["n_failure_types"][index] = len(equipment.failure_types)
+        self.arrays["last_failure_type"][index] = -1
+        equipment._fleet = self
+        equipment._fleet_index = index
+        self.equipment.append(equipment)
+        self.size += 1
+        return index
+
+    def remove(self, equipment):
+        
+        index = equipment._fleet_index
+        for name in self.FIELDS:
+            if hasattr(type(equipment), name):
+                equipment.__dict__[name] = self.get(name, index)
+        equipment._fleet = None
+        equipment._fleet_index = None
+        last = self.size - 1
+        if index != last:
+            for array in self.arrays.values():
+                array[index] = array[last]
+            moved = self.equipment[last]
+            moved._fleet_index = index
+            self.equipment[index] = moved
+        self.equipment.pop()
+        self.size -= 1
+
+    def step(self, draws=None):
+        
+        # Same per-tick model as IndustrialEquipment.simulate_operation, for every operational machine at once.
+        # draws optionally supplies this tick's (4, len(fleet)) uniforms, one column per machine,
+        # for callers that need each machine on its own random stream.
+        a = self.arrays
+        idx = np.flatnonzero(a["status"][:self.size] == 0)
+        draws = self.rng.random((4, len(idx))) if draws is None else draws[:, idx]
+
+        efficiency = np.maximum(a["efficiency"][idx] - 0.05 * draws[0], 0)
+        a["efficiency"][idx] = efficiency
+        a["current_capacity"][idx] = a["max_capacity"][idx] * efficiency
+
+        temperature = a["temperature"][idx] + 4 * draws[1] - 2
+        a["temperature"][idx] = temperature
+        temp_failed = (temperature < a["temp_low"][idx]) | (temperature > a["temp_high"][idx])
+        random_failed = draws[2] < a["failure_rate"][idx]
+        failure_type = (draws[3] * a["n_failure_types"][idx]).astype(np.int64)
+
+        a["status"][idx[temp_failed | random_failed]] = 1
+        a["failure_count"][idx] += temp_failed.astype(np.int64) + random_failed
+        a["operational_time"][idx] += ~random_failed
+        a["last_failure_type"][idx[random_failed]] = failure_type[random_failed]
+
+        if self.log_events:
+            now = datetime.now()
+            for i in idx[temp_failed]:
+                equipment = self.equipment[i]
+                equipment.logs.append(f"{now}: Equipment {equipment.name} failed due to temperature out of range!")
+            for i, kind in zip(idx[random_failed], failure_type[random_failed]):
+                equipment = self.equipment[i]
+                equipment.logs.append(f"{now}: Equipment {equipment.name} failed due to {equipment.failure_types[kind]}.")
+
+        return self.status, self.current_capacity, self.temperature
+
 class Sensor:
     def __init__(self, sensor_id, equipment_id, sensor_type, unit, min_value, max_value, failure_type=None, drift_rate=0.01):
         self.sensor_id = sensor_id
@@ -111,11 +292,155 @@ class Sensor:
     def __repr__(self):
         return f"Sensor {self.sensor_id}: {self.sensor_type} ({self.unit}), Reading: {self.value}"
 
+def _read_healthy(bank, idx, u):
+    low = bank.min_value[idx]
+    values = low + u * (bank.max_value[idx] - low)
+    bank.value[idx] = values
+    return values
+
+def _read_stuck(bank, idx, u):
+    return bank.value[idx]
+
+def _read_overload(bank, idx, u):
+    return bank.max_value[idx] - 10 + 10 * u
+
+def _read_drift(bank, idx, u):
+    drift = bank.drift_rate[idx]
+    values = np.clip(bank.value[idx] + (2 * u - 1) * drift, bank.min_value[idx], bank.max_value[idx])
+    bank.value[idx] = values
+    return values
+
+class SensorBank:
+    # Fault model readers take (bank, indices, uniform draws) and return one reading per index.
+    fault_models = {None: _read_healthy, "stuck": _read_stuck, "overload": _read_overload, "drift": _read_drift}
+
+    def __init__(self, sensors=(), seed=None, capacity=64):
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self.sensor_ids = []
+        self.equipment_ids = []
+        self.fault_names = list(self.fault_models)
+        self.min_value = np.zeros(capacity)
+        self.max_value = np.zeros(capacity)
+        self.value = np.zeros(capacity)
+        self.drift_rate = np.zeros(capacity)
+        self.fault_code = np.zeros(capacity, dtype=np.int16)
+        self.readings = np.zeros(capacity)
+        self._groups = None
+        for sensor in sensors:
+            self.add(sensor)
+
+    @classmethod
+    def register_fault_model(cls, name, reader):
+        
+        cls.fault_models = {**cls.fault_models, name: reader}
+
+    def __len__(self):
+        return self.size
+
+    def add(self, sensor):
+        
+        if self.size == len(self.value):
+            for name in ("min_value", "max_value", "value", "drift_rate", "fault_code", "readings"):
+                array = getattr(self, name)
+                grown = np.zeros(2 * len(array), dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                setattr(self, name, grown)
+        index = self.size
+        self.sensor_ids.append(sensor.sensor_id)
+        self.equipment_ids.append(sensor.equipment_id)
+        self.min_value[index] = sensor.min_value
+        self.max_value[index] = sensor.max_value
+        self.value[index] = sensor.value
+        self.drift_rate[index] = sensor.drift_rate
+        self.size += 1
+        self.set_fault(index, sensor.failure_type)
+        return index
+
+    def set_fault(self, index, failure_type):
+        
+        if failure_type not in self.fault_models:
+            raise ValueError(f"Unknown sensor fault model: {failure_type}")
+        if failure_type not in self.fault_names:
+            self.fault_names.append(failure_type)
+        self.fault_code[index] = self.fault_names.index(failure_type)
+        self._groups = None
+
+    def read(self):
+        
+        # One uniform draw per sensor, then one vectorized reader call per fault mode present.
+        n = self.size
+        if self._groups is None:
+            codes = self.fault_code[:n]
+            self._groups = [(self.fault_models[self.fault_names[code]], np.flatnonzero(codes == code))
+                            for code in np.unique(codes)]
+        u = self.rng.random(n)
+        readings = self.readings[:n]
+        for reader, idx in self._groups:
+            readings[idx] = reader(self, idx, u[idx])
+        return readings
+
+# Each entry moves the schema up one PRAGMA user_version; append, never edit.
+SCHEMA_MIGRATIONS = [
+    [
+        "CREATE INDEX IF NOT EXISTS idx_sensor_data_sensor_ts ON sensor_data (sensor_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_equipment_data_equipment_ts ON equipment_data (equipment_id, timestamp)",
+    ],
+    [
+        *(f'''
+        CREATE TABLE IF NOT EXISTS sensor_rollup_{name} (
+            sensor_id TEXT,
+            bucket INTEGER,
+            min_value REAL,
+            max_value REAL,
+            sum_value REAL,
+            count INTEGER,
+            PRIMARY KEY (sensor_id, bucket)
+        ) WITHOUT ROWID''' for name in ("1m", "1h", "1d")),
+        '''
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            source TEXT PRIMARY KEY,
+            high_water_mark INTEGER
+        )''',
+    ],
+    [
+        *(f'''
+        CREATE TABLE IF NOT EXISTS energy_rollup_{name} (
+            equipment_id TEXT,
+            bucket INTEGER,
+            energy_kwh REAL,
+            max_kw REAL,
+            samples INTEGER,
+            PRIMARY KEY (equipment_id, bucket)
+        ) WITHOUT ROWID''' for name in ("15min", "hour", "day")),
+    ],
+]
+
+# Rollup resolutions in bucket seconds, finest first; the query planner walks them in this order.
+ROLLUP_RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+def _format_timestamp(value):
+    # Stored timestamps are UTC (CURRENT_TIMESTAMP). Aware datetimes are converted to UTC;
+    # naive datetimes are taken to already be UTC, so pass datetime.now(timezone.utc), not datetime.now().
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, np.datetime64):
+        value = value.astype("datetime64[s]").astype(np.int64)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return datetime.fromtimestamp(float(value), timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, str):
+        return value
+    raise TypeError(f"Unsupported timestamp type: {type(value).__name__}")
 
 class Database:
-    def __init__(self, db_name="digital_twin.db"):
-        self.connection = sqlite3.connect(db_name)
+    def __init__(self, db_name="digital_twin.db", journal_mode="WAL", synchronous="NORMAL", check_same_thread=True):
+        self.db_name = db_name
+        self.connection = sqlite3.connect(db_name, check_same_thread=check_same_thread)
         self.cursor = self.connection.cursor()
+        self.cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.cursor.execute(f"PRAGMA synchronous={synchronous}")
         self.create_tables()
 
     def create_tables(self):
@@ -138,6 +463,17 @@ class Database:
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )''')
         self.connection.commit()
+        self.migrate()
+
+    def migrate(self):
+        
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+            with self.connection:
+                for statement in statements:
+                    self.cursor.execute(statement)
+                self.cursor.execute(f"PRAGMA user_version = {target}")
+        return len(SCHEMA_MIGRATIONS)
 
     def store_data(self, sensor_id, equipment_id, value):
        
@@ -153,6 +489,10 @@ class Database:
         VALUES (?, ?, ?, ?)''', (equipment_id, status, efficiency, temperature))
         self.connection.commit()
 
+    def buffered_writer(self, max_rows=1000, max_age=1.0):
+        
+        return BufferedWriter(self, max_rows=max_rows, max_age=max_age)
+
     def retrieve_data(self, sensor_id, limit=10):
         
         self.cursor.execute('''
@@ -165,34 +505,371 @@ class Database:
         SELECT * FROM equipment_data WHERE equipment_id = ? ORDER BY timestamp DESC LIMIT ?''', (equipment_id, limit))
         return self.cursor.fetchall()
 
+    def query_range(self, sensor_ids, start, end):
+        
+        # Returns {sensor_id: (timestamps, values)} as datetime64[s] / float64 arrays, oldest first.
+        if isinstance(sensor_ids, str):
+            sensor_ids = [sensor_ids]
+        sensor_ids = list(sensor_ids)
+        placeholders = ", ".join("?" * len(sensor_ids))
+        rows = self.cursor.execute(f'''
+        SELECT sensor_id, timestamp, value FROM sensor_data
+        WHERE sensor_id IN ({placeholders}) AND timestamp >= ? AND timestamp < ?
+        ORDER BY sensor_id, timestamp''', (*sensor_ids, _format_timestamp(start), _format_timestamp(end))).fetchall()
+        return self._split_series(sensor_ids, rows)
+
+    def query_equipment_range(self, equipment_ids, start, end, column="efficiency"):
+        
+        if column not in ("efficiency", "temperature"):
+            raise ValueError(f"Unknown equipment_data column: {column}")
+        if isinstance(equipment_ids, str):
+            equipment_ids = [equipment_ids]
+        equipment_ids = list(equipment_ids)
+        placeholders = ", ".join("?" * len(equipment_ids))
+        rows = self.cursor.execute(f'''
+        SELECT equipment_id, timestamp, {column} FROM equipment_data
+        WHERE equipment_id IN ({placeholders}) AND timestamp >= ? AND timestamp < ?
+        ORDER BY equipment_id, timestamp''', (*equipment_ids, _format_timestamp(start), _format_timestamp(end))).fetchall()
+        return self._split_series(equipment_ids, rows)
+
+    def rollup_job(self, batch_rows=100000, retention=None):
+        
+        return RollupJob(self, batch_rows=batch_rows, retention=retention)
+
+    def rollup_high_water_mark(self):
+        
+        return self._rollup_state("sensor_data")
+
+    def query_series(self, sensor_id, start, end, max_points=1000):
+        
+        # Picks the finest source that returns at most max_points points for the range: raw rows,
+        # then the 1m/1h/1d rollups. Returns a dict with the chosen resolution and
+        # timestamps / mean / min / max / count arrays, oldest first. Rollup results are whole
+        # buckets, so the first and last may extend past start and end.
+        start, end = _format_timestamp(start), _format_timestamp(end)
+        raw_rows = self.cursor.execute('''
+        SELECT COUNT(*) FROM (SELECT 1 FROM sensor_data
+        WHERE sensor_id = ? AND timestamp >= ? AND timestamp < ? LIMIT ?)''', (sensor_id, start, end, max_points + 1)).fetchone()[0]
+        start_epoch, end_epoch = self.cursor.execute("SELECT CAST(strftime('%s', ?) AS INTEGER), CAST(strftime('%s', ?) AS INTEGER)", (start, end)).fetchone()
+        # Raw rows are only complete from the last prune cutoff onwards.
+        if raw_rows <= max_points and start_epoch >= self._rollup_state("pruned_before"):
+            timestamps, values = self.query_range([sensor_id], start, end)[sensor_id]
+            return {"resolution": "raw", "timestamps": timestamps, "mean": values, "min": values, "max": values,
+                    "count": np.ones(len(values), dtype=np.int64)}
+        for resolution, width in ROLLUP_RESOLUTIONS.items():
+            if (end_epoch - start_epoch) / width <= max_points:
+                break
+        # Both sources cover whole buckets: the range is widened to bucket boundaries, so the edge
+        # buckets hold the same rows whether or not the rollup job has reached them yet.
+        bucket_start = start_epoch // width * width
+        bucket_end = -(-end_epoch // width) * width
+        # Rows past the high-water mark are not rolled up yet; aggregate them on the fly so the
+        # newest buckets are never missing.
+        rows = self.cursor.execute(f'''
+        SELECT bucket, MIN(min_value), MAX(max_value), SUM(sum_value), SUM(count) FROM (
+            SELECT bucket, min_value, max_value, sum_value, count FROM sensor_rollup_{resolution}
+            WHERE sensor_id = ? AND bucket >= ? AND bucket < ?
+            UNION ALL
+            SELECT CAST(strftime('%s', timestamp) AS INTEGER) / {width} * {width}, value, value, value, 1 FROM sensor_data
+            WHERE sensor_id = ? AND timestamp >= ? AND timestamp < ? AND id > ?
+        ) GROUP BY bucket ORDER BY bucket''', (sensor_id, bucket_start, bucket_end, sensor_id, _format_timestamp(bucket_start),
+                                                _format_timestamp(bucket_end), self.rollup_high_water_mark())).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return {"resolution": resolution, "timestamps": data[:, 0].astype(np.int64).astype("datetime64[s]"),
+                "mean": data[:, 3] / data[:, 4], "min": data[:, 1], "max": data[:, 2], "count": data[:, 4].astype(np.int64)}
+
+    def _rollup_state(self, source):
+        row = self.cursor.execute("SELECT high_water_mark FROM rollup_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else 0
+
+    def prune_raw(self, max_age, now=None):
+        
+        # Deletes raw sensor rows older than max_age seconds, but only ones already folded into
+        # the rollups. Freed pages are reused by later inserts, so the file stops growing.
+        cutoff = int((time.time() if now is None else now) - max_age)
+        with self.connection:
+            deleted = self.cursor.execute('''
+            DELETE FROM sensor_data WHERE id <= ? AND timestamp < ?''', (self.rollup_high_water_mark(), _format_timestamp(cutoff))).rowcount
+            if deleted:
+                self.cursor.execute('''
+                INSERT INTO rollup_state (source, high_water_mark) VALUES ('pruned_before', ?)
+                ON CONFLICT (source) DO UPDATE SET high_water_mark = MAX(high_water_mark, excluded.high_water_mark)''', (cutoff,))
+        return deleted
+
+    def _split_series(self, ids, rows):
+        series = {key: (np.empty(0, dtype="datetime64[s]"), np.empty(0)) for key in ids}
+        if not rows:
+            return series
+        keys, timestamps, values = zip(*rows)
+        keys = np.array(keys)
+        timestamps = np.array(timestamps, dtype="datetime64[s]")
+        values = np.array(values, dtype=float)
+        # Rows arrive grouped by id, so each series is one contiguous slice.
+        boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(keys)]))
+        for lo, hi in zip(starts, ends):
+            series[keys[lo]] = (timestamps[lo:hi], values[lo:hi])
+        return series
+
     def close(self):
        
         self.connection.close()
 
+class BufferedWriter:
+    # Rows are only written by flush(): either when an append finds max_rows or max_age exceeded,
+    # or when the caller flushes. There is no timer, so a writer that stops receiving rows keeps
+    # its last batch until flush() is called (or the with-block exits).
+    def __init__(self, database, max_rows=1000, max_age=1.0):
+        self.db = database
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.sensor_rows = []
+        self.equipment_rows = []
+        self.oldest = None
+        # lock guards the buffers (appends may come from another thread than flush);
+        # write_lock keeps concurrent flushes from interleaving their transactions.
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+    def store_data(self, sensor_id, equipment_id, value):
+        
+        with self.lock:
+            self.sensor_rows.append((sensor_id, equipment_id, value))
+        self._after_append()
+
+    def store_data_many(self, sensor_ids, equipment_ids, values):
+        
+        rows = list(zip(sensor_ids, equipment_ids, np.asarray(values).tolist()))
+        with self.lock:
+            self.sensor_rows.extend(rows)
+        self._after_append()
+
+    def store_equipment_data_many(self, equipment_ids, statuses, efficiencies, temperatures):
+        
+        rows = list(zip(equipment_ids, np.asarray(statuses).tolist(), np.asarray(efficiencies).tolist(), np.asarray(temperatures).tolist()))
+        with self.lock:
+            self.equipment_rows.extend(rows)
+        self._after_append()
+
+    def store_equipment_data(self, equipment_id, status, efficiency, temperature):
+        
+        with self.lock:
+            self.equipment_rows.append((equipment_id, status, efficiency, temperature))
+        self._after_append()
+
+    def _after_append(self):
+        with self.lock:
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            pending = len(self.sensor_rows) + len(self.equipment_rows)
+            oldest = self.oldest
+        if pending >= self.max_rows or time.monotonic() - oldest >= self.max_age:
+            self.flush()
+
+    def flush(self, database=None):
+        
+        # database lets a flush run on a connection owned by the calling thread (see AsyncScheduler).
+        db = self.db if database is None else database
+        with self.write_lock:
+            return self._write(db)
+
+    def _write(self, db):
+        with self.lock:
+            sensor_rows, self.sensor_rows = self.sensor_rows, []
+            equipment_rows, self.equipment_rows = self.equipment_rows, []
+            self.oldest = None
+        if not sensor_rows and not equipment_rows:
+            return 0
+        # One transaction (and one fsync) for everything buffered so far.
+        try:
+            with db.connection:
+                if sensor_rows:
+                    db.cursor.executemany('''
+                    INSERT INTO sensor_data (sensor_id, equipment_id, value)
+                    VALUES (?, ?, ?)''', sensor_rows)
+                if equipment_rows:
+                    db.cursor.executemany('''
+                    INSERT INTO equipment_data (equipment_id, status, efficiency, temperature)
+                    VALUES (?, ?, ?, ?)''', equipment_rows)
+        except Exception:
+            # The transaction rolled back: put the rows back in front of anything appended since,
+            # so the next flush retries them in order.
+            with self.lock:
+                self.sensor_rows[:0] = sensor_rows
+                self.equipment_rows[:0] = equipment_rows
+                self.oldest = time.monotonic()
+            raise
+        return len(sensor_rows) + len(equipment_rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+class RollupJob:
+    # Folds new sensor_data rows into the 1m/1h/1d rollup tables, batch_rows ids at a time,
+    # advancing the rollup_state high-water mark in the same transaction.
+    def __init__(self, database, batch_rows=100000, retention=None):
+        self.db = database
+        self.batch_rows = batch_rows
+        self.retention = retention
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, database=None):
+        
+        db = self.db if database is None else database
+        rolled = 0
+        while True:
+            high_water_mark = db.rollup_high_water_mark()
+            upto = db.cursor.execute('''
+            SELECT MAX(id) FROM (SELECT id FROM sensor_data WHERE id > ? ORDER BY id LIMIT ?)''', (high_water_mark, self.batch_rows)).fetchone()[0]
+            if upto is None:
+                break
+            with db.connection:
+                for name, width in ROLLUP_RESOLUTIONS.items():
+                    db.cursor.execute(f'''
+                    INSERT INTO sensor_rollup_{name} (sensor_id, bucket, min_value, max_value, sum_value, count)
+                    SELECT sensor_id, CAST(strftime('%s', timestamp) AS INTEGER) / {width} * {width} AS bucket,
+                           MIN(value), MAX(value), SUM(value), COUNT(*)
+                    FROM sensor_data WHERE id > ? AND id <= ? GROUP BY sensor_id, bucket
+                    ON CONFLICT (sensor_id, bucket) DO UPDATE SET
+                        min_value = MIN(min_value, excluded.min_value),
+                        max_value = MAX(max_value, excluded.max_value),
+                        sum_value = sum_value + excluded.sum_value,
+                        count = count + excluded.count''', (high_water_mark, upto))
+                db.cursor.execute('''
+                INSERT INTO rollup_state (source, high_water_mark) VALUES ('sensor_data', ?)
+                ON CONFLICT (source) DO UPDATE SET high_water_mark = excluded.high_water_mark''', (upto,))
+            rolled += upto - high_water_mark
+        if self.retention is not None:
+            db.prune_raw(self.retention)
+        return rolled
+
+    def start(self, interval=60.0):
+        
+        # The background thread opens its own connection, so this needs a file-backed database.
+        def loop():
+            db = Database(self.db.db_name)
+            try:
+                while not self._stop.wait(interval):
+                    self.run_once(db)
+            finally:
+                db.close()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="sensor-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
 class PredictiveMaintenance:
-    def __init__(self, historical_data):
-        self.model = LinearRegression()
+    # Recursive least squares fit of value ~ a + b * (time - reference_time), one model per equipment
+    # id (or one shared model). Time is offset by reference_time (the first update's time unless
+    # given), since raw epoch seconds (~1.7e9) leave the 2x2 covariance badly conditioned.
+    def __init__(self, historical_data, equipment_ids=None, forgetting_factor=1.0, initial_covariance=1e6, reference_time=None):
+        self.model_index = {equipment_id: i for i, equipment_id in enumerate(equipment_ids or [])}
+        num_models = max(len(self.model_index), 1)
+        self.forgetting_factor = forgetting_factor
+        self.initial_covariance = initial_covariance
+        self.reference_time = reference_time
+        self.theta = np.zeros((num_models, 2))
+        self.P = np.tile(np.eye(2) * initial_covariance, (num_models, 1, 1))
         self.train_model(historical_data)
 
+    def index_of(self, equipment_id):
+        if not self.model_index:
+            return 0
+        try:
+            return self.model_index[equipment_id]
+        except KeyError:
+            raise KeyError(f"No failure model for equipment {equipment_id!r}") from None
+
+    def add_model(self, equipment_id):
+        
+        # Gives equipment added at runtime its own fresh model; a no-op for a shared model or a known id.
+        if not self.model_index or equipment_id in self.model_index:
+            return self.index_of(equipment_id)
+        self.model_index[equipment_id] = len(self.theta)
+        self.theta = np.vstack([self.theta, np.zeros((1, 2))])
+        self.P = np.concatenate([self.P, np.eye(2)[None] * self.initial_covariance])
+        return self.model_index[equipment_id]
+
+    def _elapsed(self, current_time):
+        if self.reference_time is None:
+            self.reference_time = current_time
+        return current_time - self.reference_time
+
     def train_model(self, data):
         
-        X = np.array([d[0] for d in data]).reshape(-1, 1)  # Assume 1 feature (e.g., time)
-        y = np.array([d[1] for d in data])  
-        self.model.fit(X, y)
+        for current_time, value in data:
+            self.update(current_time, value)
+
+    def update(self, current_time, value, equipment_id=None):
+        
+        # O(1) per model; equipment_id=None updates every model with the same reading.
+        if equipment_id is None:
+            self._update(slice(None), current_time, value)
+            return
+        # Plain-float path for a single model: NumPy call overhead dominates a 2x2 update.
+        i = self.index_of(equipment_id)
+        current_time = self._elapsed(current_time)
+        lam = self.forgetting_factor
+        a, b = self.theta[i].tolist()
+        (p00, p01), (p10, p11) = self.P[i].tolist()
+        px0 = p00 + p01 * current_time
+        px1 = p10 + p11 * current_time
+        denom = lam + px0 + px1 * current_time
+        k0, k1 = px0 / denom, px1 / denom
+        error = value - (a + b * current_time)
+        self.theta[i] = (a + k0 * error, b + k1 * error)
+        self.P[i] = (((p00 - k0 * px0) / lam, (p01 - k0 * px1) / lam),
+                     ((p10 - k1 * px0) / lam, (p11 - k1 * px1) / lam))
+
+    def update_fleet(self, current_time, values):
+        
+        # One reading per model (in equipment_ids order), all models updated in one vectorized pass.
+        self._update(slice(None), current_time, values)
 
-    def predict_failure(self, current_time):
+    def _update(self, index, current_time, value):
+        theta = self.theta[index]
+        P = self.P[index]
+        x = np.empty((len(theta), 2))
+        x[:, 0] = 1.0
+        x[:, 1] = self._elapsed(current_time)
+        Px = np.einsum("mij,mj->mi", P, x)
+        gain = Px / (self.forgetting_factor + np.einsum("mi,mi->m", Px, x))[:, None]
+        error = value - np.einsum("mi,mi->m", theta, x)
+        self.theta[index] = theta + gain * error[:, None]
+        self.P[index] = (P - gain[:, :, None] * Px[:, None, :]) / self.forgetting_factor
+
+    def predict_failure(self, current_time, equipment_id=None):
+        
+        intercept, slope = self.theta[self.index_of(equipment_id)]
+        return intercept + slope * (current_time - (self.reference_time or 0.0))
+
+    def predict_fleet(self, current_time):
         
-        prediction = self.model.predict([[current_time]])
-        return prediction[0]
+        return self.theta[:, 0] + self.theta[:, 1] * (current_time - (self.reference_time or 0.0))
 
-    def check_for_failure(self, current_time, threshold=0.1):
+    def check_for_failure(self, current_time, threshold=0.1, equipment_id=None):
        
-        prediction = self.predict_failure(current_time)
+        prediction = self.predict_failure(current_time, equipment_id)
         if prediction < threshold:
             print(f"Prediction indicates failure risk at time {current_time}")
             return True
         return False
 
+    def check_fleet(self, current_time, threshold=0.1):
+        
+        return self.predict_fleet(current_time) < threshold
+
 class ReportGenerator:
     def __init__(self, equipment, db):
         self.equipment = equipment
@@ -219,45 +896,182 @@ class ReportGenerator:
         for sensor in self.equipment.logs:
             print(sensor)
             
+class EquipmentRegistry:
+    def __init__(self, equipment_list=(), sensors=()):
+        self.equipment = {}
+        self.sensors_by_equipment = {}
+        for equipment in equipment_list:
+            self.add_equipment(equipment)
+        for sensor in sensors:
+            self.add_sensor(sensor)
+
+    def add_equipment(self, equipment):
+        
+        self.equipment[equipment.id] = equipment
+        self.sensors_by_equipment.setdefault(equipment.id, {})
+
+    def remove_equipment(self, equipment_id):
+        
+        # Sensors stay registered under the id so re-adding the equipment picks them up again.
+        return self.equipment.pop(equipment_id)
+
+    def add_sensor(self, sensor):
+        
+        self.sensors_by_equipment.setdefault(sensor.equipment_id, {})[sensor.sensor_id] = sensor
+
+    def remove_sensor(self, sensor_id, equipment_id):
+        
+        return self.sensors_by_equipment[equipment_id].pop(sensor_id)
+
+    def sensors_for(self, equipment_id):
+        
+        return self.sensors_by_equipment.get(equipment_id, {}).values()
+
+    def equipment_list(self):
+        return list(self.equipment.values())
+
+    def sensor_list(self):
+        return [sensor for sensors in self.sensors_by_equipment.values() for sensor in sensors.values()]
+
 class DigitalTwinControl:
     def __init__(self, equipment_list, sensors, database, predictive_maintenance, report_generator):
-        self.equipment_list = equipment_list
-        self.sensors = sensors
+        self.registry = EquipmentRegistry(equipment_list, sensors)
         self.db = database
         self.predictive_maintenance = predictive_maintenance
         self.report_generator = report_generator
+        if predictive_maintenance is not None:
+            for equipment in equipment_list:
+                predictive_maintenance.add_model(equipment.id)
+        self.fleet = None
+        self.sensor_bank = None
 
-    def start_simulation(self):
+    @property
+    def equipment_list(self):
+        return self.registry.equipment_list()
+
+    @property
+    def sensors(self):
+        return self.registry.sensor_list()
+
+    def add_equipment(self, equipment):
+        self.release_vectorized_state()
+        self.registry.add_equipment(equipment)
+        if self.predictive_maintenance is not None:
+            self.predictive_maintenance.add_model(equipment.id)
+
+    def remove_equipment(self, equipment_id):
+        self.release_vectorized_state()
+        return self.registry.remove_equipment(equipment_id)
+
+    def add_sensor(self, sensor):
+        self.release_vectorized_state()
+        self.registry.add_sensor(sensor)
+
+    def remove_sensor(self, sensor_id, equipment_id):
+        self.release_vectorized_state()
+        return self.registry.remove_sensor(sensor_id, equipment_id)
+
+    def vectorized_state(self):
         
-        while True:
-            for equipment in self.equipment_list:
-                status, capacity, temperature = equipment.simulate_operation()
+        # FleetState + SensorBank over the registry, built on first use and rebuilt after any
+        # add/remove through this class.
+        if self.fleet is None:
+            self.fleet = FleetState(self.registry.equipment_list())
+            self.sensor_bank = SensorBank(self.registry.sensor_list())
+        return self.fleet, self.sensor_bank
+
+    def release_vectorized_state(self):
+        
+        # Hands state back to the scalar objects so run_sweep/sample_equipment keep working.
+        if self.fleet is None:
+            return
+        for equipment in list(self.fleet.equipment):
+            self.fleet.remove(equipment)
+        for sensor, value in zip(self.registry.sensor_list(), self.sensor_bank.value[:len(self.sensor_bank)].tolist()):
+            sensor.value = value
+        self.fleet = None
+        self.sensor_bank = None
+
+    def sample_equipment(self, equipment, writer, sensor_types=None, simulate=True):
+        
+        if simulate:
+            status, capacity, temperature = equipment.simulate_operation()
+
+        for sensor in self.registry.sensors_for(equipment.id):
+            if sensor_types is None or sensor.sensor_type in sensor_types:
+                value = sensor.read_sensor()
+                writer.store_data(sensor.sensor_id, equipment.id, value)
+
+        if not simulate:
+            return
+
+        writer.store_equipment_data(equipment.id, equipment.status, equipment.get_efficiency(), equipment.temperature)
+
+        if self.predictive_maintenance is not None:
+            current_time = time.time()
+            self.predictive_maintenance.update(current_time, equipment.get_efficiency(), equipment.id)
+            if self.predictive_maintenance.check_for_failure(current_time, equipment_id=equipment.id):
+                print("Initiating maintenance process...")
+                equipment.perform_maintenance()
+
+    def run_sweep(self, writer):
+        
+        # Touches each registered equipment and each of its sensors exactly once.
+        for equipment in list(self.registry.equipment.values()):
+            self.sample_equipment(equipment, writer)
 
-                for sensor in self.sensors:
-                    if sensor.equipment_id == equipment.id:
-                        value = sensor.read_sensor()
-                        self.db.store_data(sensor.sensor_id, equipment.id, value)
+            if self.report_generator is not None:
+                self.report_generator.generate_report()
 
-                self.db.store_equipment_data(equipment.id, equipment.status, equipment.get_efficiency(), equipment.temperature)
+    def run_vectorized_sweep(self, writer):
+        
+        # Same work as run_sweep for the whole registry, but one FleetState.step, one
+        # SensorBank.read and two bulk appends instead of a Python call per machine and sensor.
+        # Use either this or the scalar path between add/remove calls, not both.
+        fleet, bank = self.vectorized_state()
+        status, _, temperature = fleet.step()
+        writer.store_data_many(bank.sensor_ids, bank.equipment_ids, bank.read())
+        equipment_ids = [equipment.id for equipment in fleet.equipment]
+        efficiency = fleet.efficiency * 100
+        writer.store_equipment_data_many(equipment_ids, np.take(FleetState.STATUSES, status), efficiency, temperature)
 
-                current_time = time.time()
-                if self.predictive_maintenance.check_for_failure(current_time):
+        if self.predictive_maintenance is not None:
+            current_time = time.time()
+            for equipment, value in zip(fleet.equipment, efficiency.tolist()):
+                self.predictive_maintenance.update(current_time, value, equipment.id)
+                if self.predictive_maintenance.check_for_failure(current_time, equipment_id=equipment.id):
                     print("Initiating maintenance process...")
                     equipment.perform_maintenance()
 
-                self.report_generator.generate_report()
+        if self.report_generator is not None:
+            self.report_generator.generate_report()
 
+    def start_simulation(self):
+        
+        # Sized so a whole sweep fits in the buffer; the explicit flush below commits it once.
+        writer = self.db.buffered_writer(max_rows=float("inf"), max_age=float("inf"))
+        while True:
+            self.run_sweep(writer)
+            writer.flush()
             time.sleep(5)
 
-equipment_1 = IndustrialEquipment("001", "Pump A", max_capacity=1000, efficiency=0.9, failure_rate=0.1, failure_types=["overload", "temperature"], location="Factory Floor")
-equipment_2 = IndustrialEquipment("002", "Fan B", max_capacity=800, efficiency=0.85, failure_rate=0.08, failure_types=["bearing failure", "temperature"], location="Assembly Line")
-sensor_1 = Sensor("S1", "001", "Temperature", "°C", 10, 100, failure_type="drift")
-sensor_2 = Sensor("S2", "001", "Pressure", "bar", 0, 20)
-sensor_3 = Sensor("S3", "002", "Temperature", "°C", 10, 100)
-sensor_4 = Sensor("S4", "002", "Vibration", "m/s", 0, 10)
-db = Database()
-predictive_maintenance = PredictiveMaintenance(historical_data=[(1, 95), (2, 92), (3, 90)])
-report_generator = ReportGenerator(equipment_1, db)
-
-digital_twin_control = DigitalTwinControl([equipment_1, equipment_2], [sensor_1, sensor_2, sensor_3, sensor_4], db, predictive_maintenance, report_generator)
-digital_twin_control.start_simulation()
+    def start_scheduled_simulation(self, groups, duration=None, report_period=None):
+        
+        scheduler = AsyncScheduler(self, groups, report_period=report_period)
+        asyncio.run(scheduler.run(duration))
+        return scheduler
+
+if __name__ == "__main__":
+    equipment_1 = IndustrialEquipment("001", "Pump A", max_capacity=1000, efficiency=0.9, failure_rate=0.1, failure_types=["overload", "temperature"], location="Factory Floor")
+    equipment_2 = IndustrialEquipment("002", "Fan B", max_capacity=800, efficiency=0.85, failure_rate=0.08, failure_types=["bearing failure", "temperature"], location="Assembly Line")
+    sensor_1 = Sensor("S1", "001", "Temperature", "°C", 10, 100, failure_type="drift")
+    sensor_2 = Sensor("S2", "001", "Pressure", "bar", 0, 20)
+    sensor_3 = Sensor("S3", "002", "Temperature", "°C", 10, 100)
+    sensor_4 = Sensor("S4", "002", "Vibration", "m/s", 0, 10)
+    db = Database()
+    now = time.time()
+    predictive_maintenance = PredictiveMaintenance(historical_data=[(now - 2, 95), (now - 1, 92), (now, 90)], equipment_ids=[equipment_1.id, equipment_2.id])
+    report_generator = ReportGenerator(equipment_1, db)
+
+    digital_twin_control = DigitalTwinControl([equipment_1, equipment_2], [sensor_1, sensor_2, sensor_3, sensor_4], db, predictive_maintenance, report_generator)
+    digital_twin_control.start_simulation()
@@ -1,49 +1,119 @@
+import sqlite3
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
 
+FEATURES = ["Temperature", "Vibration"]
+TARGET = "Failure"
 
-def generate_data(num_samples=1000):
-    np.random.seed(42)
-    temperature = np.random.normal(25, 5, num_samples)  
-    vibration = np.random.normal(0.5, 0.1, num_samples)  
+
+def generate_data(num_samples=1000, seed=42):
+    rng = np.random.RandomState(seed)
+    temperature = rng.normal(25, 5, num_samples)  
+    vibration = rng.normal(0.5, 0.1, num_samples)  
     failure = (temperature > 30) | (vibration > 0.7)  
     return pd.DataFrame({"Temperature": temperature, "Vibration": vibration, "Failure": failure})
 
 
-data = generate_data()
-
-
-X = data[["Temperature", "Vibration"]]
-y = data["Failure"]
-
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-
-model = LinearRegression()
-model.fit(X_train, y_train)
-
-
-y_pred = model.predict(X_test)
-y_pred_binary = (y_pred > 0.5).astype(int)
-
-
-mse = mean_squared_error(y_test, y_pred_binary)
-accuracy = np.mean(y_pred_binary == y_test)
-
-print(f"Mean Squared Error: {mse}")
-print(f"Accuracy: {accuracy * 100:.2f}%")
-
-
-plt.figure(figsize=(10, 6))
-plt.scatter(X_test["Temperature"], y_test, color="blue", label="Actual Failure")
-plt.scatter(X_test["Temperature"], y_pred_binary, color="red", label="Predicted Failure")
-plt.xlabel("Temperature")
-plt.ylabel("Failure (0 = No, 1 = Yes)")
-plt.title("Predictive Maintenance: Failure Prediction")
-plt.legend()
-plt.show()
+def iter_generated_chunks(num_samples, chunksize=100000, seed=42):
+    
+    for i, start in enumerate(range(0, num_samples, chunksize)):
+        yield generate_data(min(chunksize, num_samples - start), seed=seed + i)
+
+
+def iter_csv_chunks(path, chunksize=100000):
+    
+    yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def iter_parquet_chunks(path, chunksize=100000):
+    
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Parquet input needs pyarrow (pip install pyarrow)") from exc
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def iter_sqlite_chunks(db_name, query, params=(), chunksize=100000):
+    
+    # query must return the feature columns and the target column, e.g. a join of
+    # sensor_features (see feature_pipeline) with a table of labelled failures.
+    connection = sqlite3.connect(db_name)
+    try:
+        yield from pd.read_sql_query(query, connection, params=params, chunksize=chunksize)
+    finally:
+        connection.close()
+
+
+def classification_counts(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=bool)
+    y_pred = np.asarray(y_pred, dtype=bool)
+    return np.array([
+        np.count_nonzero(y_true & y_pred),
+        np.count_nonzero(~y_true & y_pred),
+        np.count_nonzero(y_true & ~y_pred),
+        np.count_nonzero(~y_true & ~y_pred),
+    ])
+
+
+def classification_metrics(counts):
+    tp, fp, fn, tn = (int(count) for count in counts)
+    total = tp + fp + fn + tn
+    return {
+        "Samples": total,
+        "Precision": tp / (tp + fp) if tp + fp else 0.0,
+        "Recall": tp / (tp + fn) if tp + fn else 0.0,
+        "Accuracy": (tp + tn) / total if total else 0.0,
+    }
+
+
+def train_incremental(chunks, features=FEATURES, target=TARGET, holdout_every=5, random_state=42):
+    
+    # Out-of-core training: each chunk updates the scaler and an SGD logistic-regression model
+    # with partial_fit, then is dropped. Every holdout_every-th chunk is never trained on and is
+    # scored instead, so precision/recall come from the same single pass over the data.
+    scaler = StandardScaler()
+    model = SGDClassifier(loss="log_loss", random_state=random_state)
+    counts = np.zeros(4, dtype=np.int64)
+    for i, chunk in enumerate(chunks):
+        X = chunk[features].to_numpy(dtype=np.float64)
+        y = chunk[target].to_numpy(dtype=bool)
+        if holdout_every and i % holdout_every == holdout_every - 1 and hasattr(model, "coef_"):
+            counts += classification_counts(y, model.predict(scaler.transform(X)))
+            continue
+        scaler.partial_fit(X)
+        model.partial_fit(scaler.transform(X), y, classes=np.array([False, True]))
+    return scaler, model, classification_metrics(counts)
+
+
+def evaluate_incremental(chunks, scaler, model, features=FEATURES, target=TARGET):
+    
+    counts = np.zeros(4, dtype=np.int64)
+    for chunk in chunks:
+        X = chunk[features].to_numpy(dtype=np.float64)
+        counts += classification_counts(chunk[target], model.predict(scaler.transform(X)))
+    return classification_metrics(counts)
+
+
+if __name__ == "__main__":
+    scaler, model, holdout_metrics = train_incremental(iter_generated_chunks(1000000, chunksize=50000))
+    test_metrics = evaluate_incremental(iter_generated_chunks(200000, chunksize=50000, seed=1000), scaler, model)
+
+    print(f"Holdout chunks: {holdout_metrics}")
+    print(f"Test set: {test_metrics}")
+
+    X_test = generate_data(1000, seed=2000)
+    y_pred_binary = model.predict(scaler.transform(X_test[FEATURES].to_numpy())).astype(int)
+
+    plt.figure(figsize=(10, 6))
+    plt.scatter(X_test["Temperature"], X_test["Failure"], color="blue", label="Actual Failure")
+    plt.scatter(X_test["Temperature"], y_pred_binary, color="red", label="Predicted Failure")
+    plt.xlabel("Temperature")
+    plt.ylabel("Failure (0 = No, 1 = Yes)")
+    plt.title("Predictive Maintenance: Failure Prediction")
+    plt.legend()
+    plt.show()
@@ -2,6 +2,8 @@ import random
 import time
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+from ring_buffer import RingBuffer
+from live_plot import LivePlotRenderer
 
 
 class EquipmentSensor:
@@ -19,44 +21,32 @@ class EquipmentSensor:
 
 
 class RealTimeMonitor:
-    def __init__(self):
+    def __init__(self, window=100):
         self.sensor = EquipmentSensor()
-        self.temperature_data = []
-        self.vibration_data = []
+        # Channel 0 is temperature, channel 1 vibration.
+        self.telemetry = RingBuffer(window, channels=2)
+        self.renderer = LivePlotRenderer(
+            self.telemetry,
+            titles=["Real-Time Temperature Monitoring", "Real-Time Vibration Monitoring"],
+            labels=["Temperature (°C)", "Vibration (m/s²)"],
+            colors=["tab:red", "tab:blue"],
+            ylims=[[20, 30], [0, 1]],
+        )
+
+    @property
+    def temperature_data(self):
+        return self.telemetry.channel(0)
+
+    @property
+    def vibration_data(self):
+        return self.telemetry.channel(1)
 
     def update_plot(self, frame):
-        temp, vib = self.sensor.update_data()
-
-        self.temperature_data.append(temp)
-        self.vibration_data.append(vib)
-
-        
-        if len(self.temperature_data) > 100:
-            self.temperature_data.pop(0)
-            self.vibration_data.pop(0)
-
-        ax1.clear()
-        ax2.clear()
-
-        ax1.plot(self.temperature_data, label="Temperature (°C)", color="tab:red")
-        ax2.plot(self.vibration_data, label="Vibration (m/s²)", color="tab:blue")
-
-        ax1.set_title("Real-Time Temperature Monitoring")
-        ax2.set_title("Real-Time Vibration Monitoring")
-
-        ax1.set_ylabel("Temperature (°C)")
-        ax2.set_ylabel("Vibration (m/s²)")
-
-        ax1.legend(loc="upper right")
-        ax2.legend(loc="upper right")
-
-        ax1.set_ylim([20, 30])
-        ax2.set_ylim([0, 1])
+        self.telemetry.append(self.sensor.update_data())
+        return self.renderer.update(frame)
 
 
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
 real_time_monitor = RealTimeMonitor()
 
-ani = FuncAnimation(fig, real_time_monitor.update_plot, interval=1000)
-plt.tight_layout()
+ani = FuncAnimation(real_time_monitor.renderer.fig, real_time_monitor.update_plot, init_func=real_time_monitor.renderer.init, interval=1000, blit=True, cache_frame_data=False)
 plt.show()
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class RingBuffer:
+    # Every sample is written twice, at slot and slot + capacity, so the latest n samples are
+    # always one contiguous slice and windows come back as views instead of copies.
+    def __init__(self, capacity, channels=1, dtype=np.float64):
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((channels, 2 * capacity), dtype=dtype)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, sample):
+        
+        self.data[:, self.head] = sample
+        self.data[:, self.head + self.capacity] = sample
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, block):
+        
+        # block is (channels, m); only the last `capacity` columns can survive anyway.
+        block = np.asarray(block, dtype=self.data.dtype).reshape(self.channels, -1)[:, -self.capacity:]
+        m = block.shape[1]
+        slots = (self.head + np.arange(m)) % self.capacity
+        self.data[:, slots] = block
+        self.data[:, slots + self.capacity] = block
+        self.head = (self.head + m) % self.capacity
+        self.count = min(self.count + m, self.capacity)
+
+    def view(self, n=None):
+        
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.capacity
+        return self.data[:, end - n:end]
+
+    def channel(self, index, n=None):
+        
+        return self.view(n)[index]
+
+    def latest(self):
+        return self.data[:, self.head + self.capacity - 1]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
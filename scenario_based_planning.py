@@ -1,34 +1,164 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import random
+from concurrent.futures import ProcessPoolExecutor
+
+def simulate_paths(rng, num_scenarios, time_horizon, growth_rate_range, uncertainty_factor, dtype=np.float64):
+    # Same model as the old per-step loop: value_t = value_{t-1} * (1 + growth + U(-u, u)),
+    # with initial value, growth and u drawn once per scenario. All shocks are drawn as one
+    # (num_scenarios, time_horizon) block and turned into paths with a cumulative product in place.
+    initial_value = rng.uniform(100, 200, num_scenarios)
+    growth_rate = rng.uniform(*growth_rate_range, num_scenarios)
+    uncertainty = rng.uniform(-uncertainty_factor, uncertainty_factor, num_scenarios)
+    paths = rng.random((num_scenarios, time_horizon), dtype=dtype)
+    paths *= 2
+    paths -= 1
+    paths *= uncertainty[:, None]
+    paths += (1 + growth_rate)[:, None]
+    np.cumprod(paths, axis=1, out=paths)
+    paths *= initial_value[:, None]
+    return paths
+
+SENSITIVITY_DTYPE = np.dtype([("growth_rate", np.float64), ("uncertainty", np.float64), ("risk", np.float64)])
+
+def cell_rng(seed, growth_rate, uncertainty):
+    # The stream depends only on the seed and the cell's parameters, so a cell gives the same
+    # answer whichever grid, process or order it is evaluated in.
+    bits = np.array([growth_rate, uncertainty], dtype=np.float64).view(np.uint64)
+    return np.random.default_rng([seed, *bits.tolist()])
+
+def evaluate_sensitivity_cell(cell):
+    seed, num_scenarios, time_horizon, growth_rate, uncertainty, dtype = cell
+    paths = simulate_paths(cell_rng(seed, growth_rate, uncertainty), num_scenarios, time_horizon, (growth_rate, growth_rate), uncertainty, dtype)
+    return float(np.mean(paths.std(axis=1) / paths.mean(axis=1)))
+
+class StreamingStatistics:
+    # Constant-memory accumulator for very large scenario sets, fed one chunk at a time.
+    # Mean/variance use Welford's update merged per chunk (Chan et al.), min/max are exact, and
+    # quantiles/VaR/CVaR come from a log-spaced histogram whose bins are ~0.1% wide, so their
+    # relative error is bounded by the bin width instead of growing with the sample count.
+    def __init__(self, low=1e-3, high=1e12, bins=20000):
+        self.low = low
+        self.log_low = np.log(low)
+        self.scale = bins / (np.log(high) - self.log_low)
+        self.edges = np.exp(self.log_low + np.arange(bins + 1) / self.scale)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.sums = np.zeros(bins)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        chunk_mean = values.mean()
+        chunk_m2 = ((values - chunk_mean) ** 2).sum()
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        index = ((np.log(np.maximum(values, self.low)) - self.log_low) * self.scale).astype(np.int64)
+        np.clip(index, 0, len(self.counts) - 1, out=index)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        self.sums += np.bincount(index, weights=values, minlength=len(self.counts))
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def quantile(self, q):
+        target = q * self.count
+        cumulative = np.cumsum(self.counts)
+        b = min(int(np.searchsorted(cumulative, target)), len(self.counts) - 1)
+        below = cumulative[b] - self.counts[b]
+        fraction = (target - below) / self.counts[b] if self.counts[b] else 0.0
+        # Geometric interpolation inside the (log-spaced) bin.
+        value = self.edges[b] * (self.edges[b + 1] / self.edges[b]) ** fraction
+        return float(np.clip(value, self.min, self.max))
+
+    def value_at_risk(self, alpha=0.05):
+        return self.quantile(alpha)
+
+    def conditional_value_at_risk(self, alpha=0.05):
+        # Mean of the worst (lowest) alpha share of outcomes.
+        target = alpha * self.count
+        cumulative = np.cumsum(self.counts)
+        b = min(int(np.searchsorted(cumulative, target)), len(self.counts) - 1)
+        below = cumulative[b] - self.counts[b]
+        tail_sum = self.sums[:b].sum()
+        if self.counts[b]:
+            tail_sum += (target - below) * self.sums[b] / self.counts[b]
+        return float(tail_sum / target) if target else float(self.min)
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95), alpha=0.05):
+        result = {
+            "Count": self.count,
+            "Mean": self.mean,
+            "Std Dev": self.std,
+            "Min": self.min,
+            "Max": self.max,
+            f"VaR ({alpha:.0%})": self.value_at_risk(alpha),
+            f"CVaR ({alpha:.0%})": self.conditional_value_at_risk(alpha),
+        }
+        for q in quantiles:
+            result[f"P{q * 100:g}"] = self.quantile(q)
+        return result
 
 class ScenarioPlanning:
-    def __init__(self, num_scenarios, time_horizon, growth_rate_range, uncertainty_factor):
+    def __init__(self, num_scenarios, time_horizon, growth_rate_range, uncertainty_factor, seed=None, dtype=np.float64):
         self.num_scenarios = num_scenarios
         self.time_horizon = time_horizon
         self.growth_rate_range = growth_rate_range
         self.uncertainty_factor = uncertainty_factor
-        self.scenarios = []
+        self.dtype = dtype
+        self.rng = np.random.default_rng(seed)
+        self.scenarios = np.empty((0, time_horizon), dtype=dtype)
+        self.sensitivity_cache = {}
 
     def generate_scenarios(self):
-        for _ in range(self.num_scenarios):
-            initial_value = random.uniform(100, 200)
-            growth_rate = random.uniform(*self.growth_rate_range)
-            uncertainty = random.uniform(-self.uncertainty_factor, self.uncertainty_factor)
-            scenario = self.simulate_scenario(initial_value, growth_rate, uncertainty)
-            self.scenarios.append(scenario)
-
-    def simulate_scenario(self, initial_value, growth_rate, uncertainty):
-        values = []
-        for t in range(self.time_horizon):
-            growth = initial_value * (1 + growth_rate + random.uniform(-uncertainty, uncertainty))
-            values.append(growth)
-            initial_value = growth
-        return values
-
-    def plot_scenarios(self):
+        paths = simulate_paths(self.rng, self.num_scenarios, self.time_horizon, self.growth_rate_range, self.uncertainty_factor, self.dtype)
+        self.scenarios = paths if len(self.scenarios) == 0 else np.concatenate([self.scenarios, paths])
+
+    def stream_statistics(self, total_scenarios=None, chunk_size=100000):
+        # Generates total_scenarios paths chunk by chunk without keeping them: memory is
+        # O(chunk_size * time_horizon) however many scenarios are run. Only the best and worst
+        # paths (by mean value, as in generate_best_case_worst_case) are retained.
+        total_scenarios = self.num_scenarios if total_scenarios is None else total_scenarios
+        terminal = StreamingStatistics()
+        risk = StreamingStatistics(low=1e-6, high=1e6)
+        best_case = worst_case = None
+        best_mean, worst_mean = -np.inf, np.inf
+        for start in range(0, total_scenarios, chunk_size):
+            paths = simulate_paths(self.rng, min(chunk_size, total_scenarios - start), self.time_horizon, self.growth_rate_range, self.uncertainty_factor, self.dtype)
+            means = paths.mean(axis=1)
+            terminal.update(paths[:, -1])
+            risk.update(paths.std(axis=1) / means)
+            best, worst = np.argmax(means), np.argmin(means)
+            if means[best] > best_mean:
+                best_mean, best_case = means[best], paths[best].copy()
+            if means[worst] < worst_mean:
+                worst_mean, worst_case = means[worst], paths[worst].copy()
+        return {
+            "Terminal Value": terminal,
+            "Risk": risk,
+            "Best Case": best_case,
+            "Worst Case": worst_case,
+        }
+
+    def plot_scenarios(self, max_lines=50):
         plt.figure(figsize=(10, 6))
-        for i, scenario in enumerate(self.scenarios):
+        for i, scenario in enumerate(self.scenarios[:max_lines]):
             plt.plot(range(self.time_horizon), scenario, label=f"Scenario {i+1}")
         plt.title("Scenario Planning Simulation")
         plt.xlabel("Time")
@@ -38,14 +168,13 @@ class ScenarioPlanning:
         plt.show()
 
     def get_summary_statistics(self):
-        summaries = []
-        for scenario in self.scenarios:
-            mean_value = np.mean(scenario)
-            std_dev = np.std(scenario)
-            min_value = np.min(scenario)
-            max_value = np.max(scenario)
-            summaries.append((mean_value, std_dev, min_value, max_value))
-        return summaries
+        # One row per scenario: mean, std, min, max.
+        return np.column_stack([
+            self.scenarios.mean(axis=1),
+            self.scenarios.std(axis=1),
+            self.scenarios.min(axis=1),
+            self.scenarios.max(axis=1),
+        ])
 
     def display_summary(self):
         summaries = self.get_summary_statistics()
@@ -53,9 +182,8 @@ class ScenarioPlanning:
             print(f"Scenario {i+1}: Mean: {mean:.2f}, Std Dev: {std:.2f}, Min: {min_val:.2f}, Max: {max_val:.2f}")
 
     def generate_best_case_worst_case(self):
-        best_case = max(self.scenarios, key=lambda x: np.mean(x))
-        worst_case = min(self.scenarios, key=lambda x: np.mean(x))
-        return best_case, worst_case
+        means = self.scenarios.mean(axis=1)
+        return self.scenarios[np.argmax(means)], self.scenarios[np.argmin(means)]
 
     def display_best_worst_case(self):
         best_case, worst_case = self.generate_best_case_worst_case()
@@ -70,37 +198,52 @@ class ScenarioPlanning:
         plt.show()
 
     def calculate_risk(self):
-        risks = []
-        for scenario in self.scenarios:
-            risk = np.std(scenario) / np.mean(scenario)
-            risks.append(risk)
-        return risks
+        return self.scenarios.std(axis=1) / self.scenarios.mean(axis=1)
 
     def display_risk(self):
         risks = self.calculate_risk()
         plt.figure(figsize=(10, 6))
-        plt.bar(range(1, self.num_scenarios + 1), risks)
+        plt.bar(range(1, len(risks) + 1), risks)
         plt.title("Scenario Risk Analysis")
         plt.xlabel("Scenario")
         plt.ylabel("Risk (Std Dev / Mean)")
         plt.grid(True)
         plt.show()
 
-    def perform_sensitivity_analysis(self, growth_rate_range, uncertainty_factor_range):
-        sensitivity_results = []
-        for growth_rate in growth_rate_range:
-            for uncertainty in uncertainty_factor_range:
-                self.growth_rate_range = (growth_rate, growth_rate)
-                self.uncertainty_factor = uncertainty
-                self.generate_scenarios()
-                risk = self.calculate_risk()
-                sensitivity_results.append((growth_rate, uncertainty, np.mean(risk)))
-        return sensitivity_results
+    def perform_sensitivity_analysis(self, growth_rate_range, uncertainty_factor_range, processes=None, seed=0):
+        return self.sensitivity_sweep(growth_rate_range, uncertainty_factor_range, processes=processes, seed=seed)
+
+    def sensitivity_sweep(self, growth_rates, uncertainties, processes=None, seed=0):
+        # Returns a (len(growth_rates), len(uncertainties)) array with growth_rate/uncertainty/risk fields.
+        # Cells are independent of self.scenarios and of each other; finished cells are cached by
+        # their parameters, so refining or extending a grid only computes the new points.
+        dtype_key = np.dtype(self.dtype).str
+        cells = [(float(g), float(u)) for g in growth_rates for u in uncertainties]
+        missing = list(dict.fromkeys(
+            cell for cell in cells
+            if (seed, self.num_scenarios, self.time_horizon, dtype_key, *cell) not in self.sensitivity_cache
+        ))
+        jobs = [(seed, self.num_scenarios, self.time_horizon, g, u, self.dtype) for g, u in missing]
+        if processes == 1 or len(jobs) <= 1:
+            risks = map(evaluate_sensitivity_cell, jobs)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                risks = list(pool.map(evaluate_sensitivity_cell, jobs))
+        for cell, risk in zip(missing, risks):
+            self.sensitivity_cache[(seed, self.num_scenarios, self.time_horizon, dtype_key, *cell)] = risk
+
+        results = np.zeros(len(cells), dtype=SENSITIVITY_DTYPE)
+        for i, cell in enumerate(cells):
+            results[i] = (*cell, self.sensitivity_cache[(seed, self.num_scenarios, self.time_horizon, dtype_key, *cell)])
+        return results.reshape(len(growth_rates), len(uncertainties))
 
     def plot_sensitivity_analysis(self, results):
-        growth_rates = [result[0] for result in results]
-        uncertainties = [result[1] for result in results]
-        risks = [result[2] for result in results]
+        if not isinstance(results, np.ndarray):
+            results = np.array([tuple(result) for result in results], dtype=SENSITIVITY_DTYPE)
+        results = results.ravel()
+        growth_rates = results["growth_rate"]
+        uncertainties = results["uncertainty"]
+        risks = results["risk"]
 
         fig = plt.figure(figsize=(10, 6))
         ax = fig.add_subplot(111, projection='3d')
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SamplingGroup:
+    def __init__(self, name, period, equipment_ids, sensor_types=None, simulate=True, deadline=None):
+        self.name = name
+        self.period = period
+        self.equipment_ids = list(equipment_ids)
+        self.sensor_types = set(sensor_types) if sensor_types is not None else None
+        self.simulate = simulate
+        self.deadline = deadline if deadline is not None else period
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.skipped_ticks = 0
+        self.total_drift = 0.0
+        self.max_drift = 0.0
+
+    def record(self, drift, elapsed):
+        self.ticks += 1
+        self.total_drift += drift
+        self.max_drift = max(self.max_drift, drift)
+        if elapsed > self.deadline:
+            self.missed_deadlines += 1
+
+    def get_statistics(self):
+        return {
+            "Group": self.name,
+            "Period (s)": self.period,
+            "Ticks": self.ticks,
+            "Missed Deadlines": self.missed_deadlines,
+            "Skipped Ticks": self.skipped_ticks,
+            "Mean Drift (ms)": (self.total_drift / self.ticks * 1e3) if self.ticks else 0.0,
+            "Max Drift (ms)": self.max_drift * 1e3,
+        }
+
+
+class AsyncScheduler:
+    def __init__(self, control, groups, report_period=None, io_workers=1):
+        self.control = control
+        self.groups = list(groups)
+        self.report_period = report_period
+        # SQLite connections can't be shared across threads, so each I/O worker opens its own
+        # connection to the same file; an in-memory database has no file to reopen.
+        if control.db.db_name == ":memory:":
+            raise ValueError("AsyncScheduler needs a file-backed Database; ':memory:' can't be opened from the I/O thread")
+        # A single I/O worker keeps every SQLite write on one thread, in submission order.
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="twin-io")
+        self.io_local = threading.local()
+        self.io_databases = []
+        self.io_errors = []
+        self.writer = control.db.buffered_writer(max_rows=float("inf"), max_age=float("inf"))
+        self.pending_io = set()
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def submit_io(self, func, *args):
+        
+        future = asyncio.get_running_loop().run_in_executor(self.io_executor, func, *args)
+        self.pending_io.add(future)
+        future.add_done_callback(self._io_done)
+        return future
+
+    def _io_done(self, future):
+        self.pending_io.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            # Failed flushes keep their rows in the writer and are retried by the next one;
+            # the errors are logged here and re-raised when run() finishes.
+            logging.getLogger(__name__).error("I/O task failed", exc_info=future.exception())
+            self.io_errors.append(future.exception())
+
+    def io_database(self):
+        
+        # Runs on an I/O worker: that thread's own connection, opened on first use.
+        db = getattr(self.io_local, "db", None)
+        if db is None:
+            db = self.io_local.db = type(self.control.db)(self.control.db.db_name, check_same_thread=False)
+            self.io_databases.append(db)
+        return db
+
+    def flush_writer(self):
+        
+        return self.writer.flush(self.io_database())
+
+    async def run_group(self, group):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while not self.stopped:
+            start = loop.time()
+            for equipment_id in group.equipment_ids:
+                equipment = self.control.registry.equipment.get(equipment_id)
+                if equipment is not None:
+                    self.control.sample_equipment(equipment, self.writer, group.sensor_types, group.simulate)
+            self.submit_io(self.flush_writer)
+            group.record(start - next_tick, loop.time() - start)
+
+            next_tick += group.period
+            now = loop.time()
+            if now > next_tick:
+                # Overran one or more periods: drop them rather than firing a burst to catch up.
+                skipped = int((now - next_tick) // group.period) + 1
+                group.skipped_ticks += skipped
+                next_tick += skipped * group.period
+            await asyncio.sleep(next_tick - now)
+
+    async def run_reports(self):
+        while not self.stopped:
+            await asyncio.sleep(self.report_period)
+            if self.control.report_generator is not None:
+                self.submit_io(self.control.report_generator.generate_report)
+
+    async def run(self, duration=None):
+        
+        tasks = [asyncio.create_task(self.run_group(group)) for group in self.groups]
+        if self.report_period is not None:
+            tasks.append(asyncio.create_task(self.run_reports()))
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            elif not tasks:
+                await asyncio.sleep(duration)
+            else:
+                # Ends early if a group or report task fails, instead of sampling on without it.
+                await asyncio.wait(tasks, timeout=duration, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            self.stop()
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # CancelledError is a BaseException, so only genuine task failures are kept.
+            task_errors = [result for result in results if isinstance(result, Exception)]
+            await asyncio.gather(*self.pending_io, return_exceptions=True)
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.io_executor, self.flush_writer)
+            finally:
+                self.io_executor.shutdown(wait=True)
+                for db in self.io_databases:
+                    db.close()
+                self.io_databases.clear()
+        if task_errors:
+            raise RuntimeError(f"{len(task_errors)} sampling task(s) failed during the run") from task_errors[0]
+        if self.io_errors:
+            raise RuntimeError(f"{len(self.io_errors)} I/O task(s) failed during the run") from self.io_errors[0]
+
+    def get_statistics(self):
+        return [group.get_statistics() for group in self.groups]
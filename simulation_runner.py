@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import pybullet as p
+import pybullet_data
+import numpy as np
+
+
+class SimulationRunner:
+    # Owns one PyBullet client and a simulated clock. Physics is always stepped explicitly;
+    # real_time only paces the loop against the wall clock (for watching in the GUI).
+    def __init__(self, gui=False, time_step=0.01, real_time=False, gravity=-9.8):
+        self.client = p.connect(p.GUI if gui else p.DIRECT)
+        self.time_step = time_step
+        self.real_time = real_time
+        self.step_count = 0
+        self.wall_start = None
+        p.setGravity(0, 0, gravity, physicsClientId=self.client)
+        p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=self.client)
+        p.setTimeStep(time_step, physicsClientId=self.client)
+        p.setRealTimeSimulation(0, physicsClientId=self.client)
+
+    @property
+    def sim_time(self):
+        return self.step_count * self.time_step
+
+    def load(self, urdf, base_position=(0, 0, 0), **kwargs):
+        
+        return p.loadURDF(urdf, basePosition=base_position, physicsClientId=self.client, **kwargs)
+
+    def step(self):
+        
+        p.stepSimulation(physicsClientId=self.client)
+        self.step_count += 1
+        if self.real_time:
+            if self.wall_start is None:
+                self.wall_start = time.perf_counter() - self.time_step
+            delay = self.wall_start + self.sim_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def run(self, steps, callback):
+        
+        # callback(sim_time, step) runs before each physics step.
+        for _ in range(steps):
+            callback(self.sim_time, self.step_count)
+            self.step()
+
+    def disconnect(self):
+        if self.client is not None:
+            p.disconnect(physicsClientId=self.client)
+            self.client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disconnect()
+
+
+def headless_requested(argv=None):
+    
+    argv = sys.argv if argv is None else argv
+    return "--headless" in argv or os.environ.get("DIGITAL_TWIN_HEADLESS", "") not in ("", "0")
+
+
+def runner_from_argv(time_step=0.01, argv=None):
+    
+    # GUI runs keep the old wall-clock pacing; headless runs go as fast as the CPU allows.
+    gui = not headless_requested(argv)
+    return SimulationRunner(gui=gui, time_step=time_step, real_time=gui)
+
+
+class JointGroup:
+    # Joint indices are resolved once; commands and reads then go through the array APIs,
+    # one client round trip each instead of one per joint.
+    def __init__(self, client, body_id, joint_indices=None):
+        self.client = client
+        self.body_id = body_id
+        if joint_indices is None:
+            joint_indices = range(p.getNumJoints(body_id, physicsClientId=client))
+        self.indices = list(joint_indices)
+        self.positions = np.zeros(len(self.indices), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def set_positions(self, target_positions):
+        
+        p.setJointMotorControlArray(self.body_id, self.indices, p.POSITION_CONTROL, targetPositions=target_positions, physicsClientId=self.client)
+
+    def read_positions(self, out=None):
+        
+        # Fills (and returns) the preallocated float32 buffer unless another is given.
+        out = self.positions if out is None else out
+        states = p.getJointStates(self.body_id, self.indices, physicsClientId=self.client)
+        out[:] = [state[0] for state in states]
+        return out
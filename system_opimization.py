@@ -1,45 +1,287 @@
-import random
+import sqlite3
+from abc import ABC, abstractmethod
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from main import FleetState
+
+# Genomes are (rpm, temperature, pressure) integer rows. Each gene is packed into 21 bits of an
+# int64 cache key, which holds any value within +/- 2**20 of zero.
+KEY_OFFSET = 1 << 20
+KEY_BITS = 21
+
+def equipment_fitness(settings):
+    
+    settings = np.asarray(settings, dtype=np.float64)
+    rpm, temperature, pressure = settings[..., 0], settings[..., 1], settings[..., 2]
+    return (rpm * 0.5) + (100 - temperature) + (30 - np.abs(pressure - 20))
+
+def genome_keys(population):
+    shifted = population.astype(np.int64) + KEY_OFFSET
+    return (shifted[:, 0] << (2 * KEY_BITS)) | (shifted[:, 1] << KEY_BITS) | shifted[:, 2]
+
+class FitnessProvider(ABC):
+    # Scores a batch of settings given a budget (e.g. simulated ticks). Scores must be comparable
+    # across budgets, so a short run is a noisy estimate of a long one; that is what lets
+    # successive halving stop poor candidates early. Set min_budget to enable it when the
+    # provider is called directly, as GeneticAlgorithmOptimization does.
+    name = "fitness"
+
+    def __init__(self, max_budget=1, min_budget=None, eta=3):
+        self.max_budget = max_budget
+        self.min_budget = min_budget
+        self.eta = eta
+
+    @abstractmethod
+    def evaluate(self, settings, budget):
+        # One score per row of settings after a run of the given budget.
+        ...
+
+    def __call__(self, settings):
+        settings = np.atleast_2d(settings)
+        if self.min_budget is None or self.min_budget >= self.max_budget:
+            return self.evaluate(settings, self.max_budget)
+        # Copies of one genome share a fate; otherwise a tie at the cut could stop some of them early.
+        unique, inverse = np.unique(settings, axis=0, return_inverse=True)
+        return self.evaluate_successive_halving(unique)[inverse.ravel()]
+
+    def evaluate_successive_halving(self, settings):
+        
+        # Every candidate runs at min_budget; each round the best 1/eta move on with eta times
+        # the budget. A candidate keeps the score from the longest run it reached, shifted so
+        # that anyone stopped in an earlier round ranks below everyone who went further.
+        scores = np.empty(len(settings))
+        survivors = np.arange(len(settings))
+        budget = self.min_budget
+        rounds = []
+        while True:
+            scores[survivors] = self.evaluate(settings[survivors], budget)
+            if budget >= self.max_budget or len(survivors) <= 1:
+                break
+            keep = max(1, int(np.ceil(len(survivors) / self.eta)))
+            order = np.argsort(scores[survivors])
+            rounds.append(survivors[order[:-keep]])
+            survivors = survivors[order[-keep:]]
+            budget = min(budget * self.eta, self.max_budget)
+
+        floor = scores[survivors].min()
+        for stopped in reversed(rounds):
+            excess = scores[stopped].max() - floor
+            if excess >= 0:
+                scores[stopped] -= excess + 1e-9 * max(abs(floor), 1.0)
+            floor = scores[stopped].min()
+        return scores
+
+class ClosedFormFitness(FitnessProvider):
+    name = "closed-form"
+
+    def evaluate(self, settings, budget):
+        return equipment_fitness(settings)
+
+class SimulationFitness(FitnessProvider):
+    # Runs one simulated machine per candidate on main.FleetState for `budget` ticks and scores
+    # the average capacity it delivered per tick. RPM sets the rated capacity, the temperature
+    # setting is the starting temperature, and pressure away from 20 bar raises the failure rate.
+    # Each candidate draws from its own stream seeded by (seed, settings), so a score depends only
+    # on the settings and budget, never on the rest of the batch; a longer budget extends the
+    # same random path.
+    def __init__(self, max_budget=200, min_budget=None, eta=3, base_failure_rate=0.002, operating_temp_range=(0, 130), seed=0, draw_block=16):
+        super().__init__(max_budget, min_budget, eta)
+        self.draw_block = draw_block
+        self.base_failure_rate = base_failure_rate
+        self.operating_temp_range = operating_temp_range
+        self.seed = seed
+        self.name = f"simulation-v2(base_failure_rate={base_failure_rate}, operating_temp_range={operating_temp_range}, seed={seed})"
+
+    def evaluate(self, settings, budget):
+        settings = np.asarray(settings, dtype=np.float64)
+        rpm, temperature, pressure = settings[:, 0], settings[:, 1], settings[:, 2]
+        streams = [np.random.default_rng([self.seed, key]) for key in genome_keys(np.rint(settings)).tolist()]
+        fleet = FleetState.from_arrays(
+            max_capacity=rpm,
+            efficiency=1.0,
+            failure_rate=self.base_failure_rate * (1 + np.abs(pressure - 20) / 5),
+            temperature=temperature,
+            operating_temp_range=self.operating_temp_range,
+            seed=self.seed,
+        )
+        delivered = np.zeros(len(settings))
+        draws = np.empty((self.draw_block, 4, len(settings)))
+        for tick in range(int(budget)):
+            block_tick = tick % self.draw_block
+            if block_tick == 0:
+                # Refill the next draw_block ticks from every candidate's own stream. Consecutive
+                # blocks continue each stream, so scores match drawing the whole run at once
+                # while only (draw_block, 4, n) draws are ever held.
+                ticks = min(self.draw_block, int(budget) - tick)
+                for i, stream in enumerate(streams):
+                    draws[:ticks, :, i] = stream.random((ticks, 4))
+            status, capacity, _ = fleet.step(draws[block_tick])
+            delivered += np.where(status == 0, capacity, 0.0)
+        return delivered / budget
+
+class CachedFitness(FitnessProvider):
+    # Persists (provider, settings, budget) -> score in SQLite so repeated or resumed searches
+    # never re-run a simulation. Connections are opened lazily so the wrapper can be shipped to
+    # worker processes.
+    def __init__(self, provider, db_name="fitness_cache.db"):
+        super().__init__(provider.max_budget, provider.min_budget, provider.eta)
+        self.provider = provider
+        self.db_name = db_name
+        self.connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["connection"] = None
+        return state
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_name, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS fitness_cache (
+                provider TEXT,
+                rpm INTEGER,
+                temperature INTEGER,
+                pressure INTEGER,
+                budget INTEGER,
+                fitness REAL,
+                PRIMARY KEY (provider, rpm, temperature, pressure, budget)
+            )''')
+            self.connection.execute("CREATE TEMP TABLE lookup (i INTEGER, rpm INTEGER, temperature INTEGER, pressure INTEGER)")
+        return self.connection
+
+    def evaluate(self, settings, budget):
+        settings = np.asarray(settings, dtype=np.int64)
+        connection = self.connect()
+        with connection:
+            connection.execute("DELETE FROM lookup")
+            connection.executemany("INSERT INTO lookup VALUES (?, ?, ?, ?)", ((i, *row) for i, row in enumerate(settings.tolist())))
+            hits = connection.execute('''
+            SELECT l.i, c.fitness FROM lookup l JOIN fitness_cache c
+            ON c.provider = ? AND c.budget = ? AND c.rpm = l.rpm AND c.temperature = l.temperature AND c.pressure = l.pressure''',
+            (self.provider.name, int(budget))).fetchall()
+
+        scores = np.full(len(settings), np.nan)
+        if hits:
+            index, values = zip(*hits)
+            scores[list(index)] = values
+        missing = np.flatnonzero(np.isnan(scores))
+        if len(missing):
+            # Duplicates are simulated once so every copy (and the cache) sees the same score.
+            unique, inverse = np.unique(settings[missing], axis=0, return_inverse=True)
+            unique_scores = self.provider.evaluate(unique, budget)
+            scores[missing] = unique_scores[inverse.ravel()]
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO fitness_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    ((self.provider.name, *row, int(budget), float(score)) for row, score in zip(unique.tolist(), unique_scores)),
+                )
+        return scores
 
 class GeneticAlgorithmOptimization:
-    def __init__(self, population_size, generations, mutation_rate):
+    def __init__(self, population_size, generations, mutation_rate, fitness=equipment_fitness, tournament_size=3, elite_fraction=0.1,
+                 crossover_rate=0.9, processes=None, max_cache_entries=5_000_000, seed=None, verbose=True):
         self.population_size = population_size
         self.generations = generations
         self.mutation_rate = mutation_rate
+        self.fitness = fitness
+        self.tournament_size = tournament_size
+        self.elite_count = max(1, int(population_size * elite_fraction))
+        self.crossover_rate = crossover_rate
+        self.processes = processes
+        self.max_cache_entries = max_cache_entries
+        self.rng = np.random.default_rng(seed)
+        self.verbose = verbose
+        self.cache_keys = np.empty(0, dtype=np.int64)
+        self.cache_values = np.empty(0)
+        self.evaluations = 0
 
     def fitness_function(self, settings):
-
-        rpm, temperature, pressure = settings
-        efficiency = (rpm * 0.5) + (100 - temperature) + (30 - abs(pressure - 20))
-        return efficiency
+        
+        fitness = self.fitness(np.atleast_2d(settings))
+        return fitness[0] if np.ndim(settings) == 1 else fitness
 
     def generate_population(self):
       
-        population = []
-        for _ in range(self.population_size):
-            rpm = random.randint(1000, 4000)
-            temperature = random.randint(60, 120)
-            pressure = random.randint(10, 30)
-            population.append((rpm, temperature, pressure))
-        return population
-
-    def mutate(self, settings):
+        return np.column_stack([
+            self.rng.integers(1000, 4001, self.population_size),
+            self.rng.integers(60, 121, self.population_size),
+            self.rng.integers(10, 31, self.population_size),
+        ])
+
+    def mutate(self, population):
+        
+        mutated = population.copy()
+        rows = np.flatnonzero(self.rng.random(len(population)) < self.mutation_rate)
+        genes = self.rng.integers(0, population.shape[1], len(rows))
+        mutated[rows, genes] += self.rng.integers(-10, 11, len(rows))
+        return mutated
+
+    def crossover(self, parents_a, parents_b):
         
-        mutated = list(settings)
-        if random.random() < self.mutation_rate:
-            mutated[random.randint(0, 2)] += random.randint(-10, 10)
-        return tuple(mutated)
+        # Uniform crossover, applied to a crossover_rate share of the pairs.
+        take_b = self.rng.random(parents_a.shape) < 0.5
+        take_b &= (self.rng.random(len(parents_a)) < self.crossover_rate)[:, None]
+        return np.where(take_b, parents_b, parents_a)
+
+    def select(self, population, fitness, count):
+        
+        contestants = self.rng.integers(0, len(population), (count, self.tournament_size))
+        winners = contestants[np.arange(count), np.argmax(fitness[contestants], axis=1)]
+        return population[winners]
+
+    def evaluate(self, population, pool=None):
+        
+        # Only genomes never scored before reach the fitness function, each at most once.
+        keys = genome_keys(population)
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        slots = np.minimum(np.searchsorted(self.cache_keys, unique_keys), max(len(self.cache_keys) - 1, 0))
+        cached = (self.cache_keys[slots] == unique_keys) if len(self.cache_keys) else np.zeros(len(unique_keys), dtype=bool)
+
+        values = np.empty(len(unique_keys))
+        values[cached] = self.cache_values[slots[cached]]
+        missing = np.flatnonzero(~cached)
+        if len(missing):
+            genomes = population[first[missing]]
+            if pool is None:
+                values[missing] = self.fitness(genomes)
+            else:
+                chunks = np.array_split(genomes, min(len(genomes), 4 * (self.processes or 1)))
+                values[missing] = np.concatenate(list(pool.map(self.fitness, chunks)))
+            self.evaluations += len(missing)
+            self.remember(unique_keys[missing], values[missing])
+        return values[inverse]
+
+    def remember(self, keys, values):
+        if len(self.cache_keys) + len(keys) > self.max_cache_entries:
+            self.cache_keys = np.empty(0, dtype=np.int64)
+            self.cache_values = np.empty(0)
+        keys = np.concatenate([self.cache_keys, keys])
+        values = np.concatenate([self.cache_values, values])
+        order = np.argsort(keys, kind="stable")
+        self.cache_keys, self.cache_values = keys[order], values[order]
 
     def run(self):
         
-        population = self.generate_population()
-        for generation in range(self.generations):
-            population = sorted(population, key=lambda x: self.fitness_function(x), reverse=True)
-            print(f"Generation {generation}: Best Fitness = {self.fitness_function(population[0])}")
-            next_population = population[:self.population_size // 2]
-            next_population = next_population + [self.mutate(x) for x in next_population]
-            population = next_population
-        return population[0]
-
-ga_optimizer = GeneticAlgorithmOptimization(population_size=10, generations=5, mutation_rate=0.1)
-best_settings = ga_optimizer.run()
-print("Best Equipment Settings (RPM, Temp, Pressure):", best_settings)
+        pool = ProcessPoolExecutor(max_workers=self.processes) if self.processes else None
+        try:
+            population = self.generate_population()
+            fitness = self.evaluate(population, pool)
+            for generation in range(self.generations):
+                if self.verbose:
+                    print(f"Generation {generation}: Best Fitness = {fitness.max()}")
+                elites = population[np.argpartition(fitness, -self.elite_count)[-self.elite_count:]]
+                children_count = self.population_size - self.elite_count
+                children = self.crossover(self.select(population, fitness, children_count), self.select(population, fitness, children_count))
+                population = np.concatenate([elites, self.mutate(children)])
+                fitness = self.evaluate(population, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return tuple(int(gene) for gene in population[np.argmax(fitness)])
+
+if __name__ == "__main__":
+    ga_optimizer = GeneticAlgorithmOptimization(population_size=10, generations=5, mutation_rate=0.1)
+    best_settings = ga_optimizer.run()
+    print("Best Equipment Settings (RPM, Temp, Pressure):", best_settings)
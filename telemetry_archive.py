@@ -0,0 +1,229 @@
+import json
+import os
+import numpy as np
+
+BLOCK_ROWS = 4096
+DELTA_DTYPES = (np.uint8, np.uint16, np.uint32, np.int64)
+
+
+def _narrowest(values, candidates):
+    top = int(values.max()) if len(values) else 0
+    for dtype in candidates:
+        if top <= np.iinfo(dtype).max:
+            return dtype
+    return candidates[-1]
+
+
+def _epoch_seconds(value):
+    # Accepts epoch seconds, datetime / datetime64, or an ISO string (UTC).
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+def _save(path, array):
+    # Write then rename, so a reader never maps a half-written file.
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+class TelemetryArchive:
+    # Columnar archive of sensor_data, one directory per day=YYYY-MM-DD/equipment=ID, each export
+    # adding a part-<first id> directory. A part holds time-sorted columns:
+    #   sensor_codes.npy       uint16/uint32 codes into the archive-wide sensor dictionary
+    #   timestamp_deltas.npy   narrowest unsigned dtype of seconds since the previous row,
+    #                          restarting at 0 every BLOCK_ROWS rows
+    #   timestamp_blocks.npy   int64 epoch seconds of each block's first row (the seek index)
+    #   values.npy             float32
+    # That is about 7-8 bytes per reading against 50+ for a sensor_data row with its index.
+    # With format="parquet" a part is a single part-<first id>.parquet file instead (needs pyarrow).
+    def __init__(self, root, format="npy"):
+        if format not in ("npy", "parquet"):
+            raise ValueError(f"Unknown archive format: {format}")
+        self.root = root
+        self.format = format
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            manifest = {"high_water_mark": 0, "sensor_ids": []}
+        self.high_water_mark = manifest["high_water_mark"]
+        self.sensor_ids = manifest["sensor_ids"]
+        self.sensor_codes = {sensor_id: code for code, sensor_id in enumerate(self.sensor_ids)}
+
+    def _save_manifest(self):
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump({"high_water_mark": self.high_water_mark, "sensor_ids": self.sensor_ids}, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    def _encode_sensors(self, sensor_ids):
+        unique, inverse = np.unique(sensor_ids, return_inverse=True)
+        for sensor_id in unique.tolist():
+            if sensor_id not in self.sensor_codes:
+                self.sensor_codes[sensor_id] = len(self.sensor_ids)
+                self.sensor_ids.append(sensor_id)
+        codes = np.array([self.sensor_codes[sensor_id] for sensor_id in unique.tolist()], dtype=np.int64)
+        return codes[inverse]
+
+    def export(self, db, batch_rows=1000000):
+        
+        # Archives every sensor_data row added since the last export; returns the row count.
+        exported = 0
+        while True:
+            rows = db.cursor.execute('''
+            SELECT id, sensor_id, equipment_id, CAST(strftime('%s', timestamp) AS INTEGER), value FROM sensor_data
+            WHERE id > ? ORDER BY id LIMIT ?''', (self.high_water_mark, batch_rows)).fetchall()
+            if not rows:
+                break
+            ids, sensor_ids, equipment_ids, timestamps, values = zip(*rows)
+            codes = self._encode_sensors(np.array(sensor_ids))
+            equipment, equipment_index = np.unique(np.array(equipment_ids), return_inverse=True)
+            timestamps = np.array(timestamps, dtype=np.int64)
+            values = np.array(values, dtype=np.float32)
+            days = timestamps // 86400
+            # Group by (day, equipment), time-sorted inside each group; lexsort is stable so ties keep id order.
+            order = np.lexsort((timestamps, equipment_index, days))
+            days, equipment_index = days[order], equipment_index[order]
+            boundaries = np.flatnonzero((days[1:] != days[:-1]) | (equipment_index[1:] != equipment_index[:-1])) + 1
+            for lo, hi in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(order)]))):
+                rows_in_part = order[lo:hi]
+                day = np.datetime64(int(days[lo]), "D")
+                directory = os.path.join(self.root, f"day={day}", f"equipment={equipment[equipment_index[lo]]}")
+                os.makedirs(directory, exist_ok=True)
+                self._write_part(os.path.join(directory, f"part-{ids[0]:012d}"),
+                                 timestamps[rows_in_part], codes[rows_in_part], values[rows_in_part])
+            # Parts are complete before the manifest moves, so a crash only re-exports the batch.
+            self.high_water_mark = ids[-1]
+            self._save_manifest()
+            exported += len(rows)
+        return exported
+
+    def _write_part(self, path, timestamps, codes, values):
+        if self.format == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as exc:
+                raise ImportError("Parquet archives need pyarrow (pip install pyarrow)") from exc
+            sensor_ids = pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), pa.array(self.sensor_ids))
+            table = pa.table({"timestamp": pa.array(timestamps), "sensor_id": sensor_ids, "value": pa.array(values)})
+            pq.write_table(table, path + ".parquet", use_dictionary=["sensor_id"],
+                           column_encoding={"timestamp": "DELTA_BINARY_PACKED", "value": "BYTE_STREAM_SPLIT"})
+            return
+        os.makedirs(path, exist_ok=True)
+        deltas = np.diff(timestamps, prepend=timestamps[0])
+        deltas[::BLOCK_ROWS] = 0
+        _save(os.path.join(path, "timestamp_blocks.npy"), timestamps[::BLOCK_ROWS].copy())
+        _save(os.path.join(path, "timestamp_deltas.npy"), deltas.astype(_narrowest(deltas, DELTA_DTYPES)))
+        _save(os.path.join(path, "sensor_codes.npy"), codes.astype(np.uint16 if len(self.sensor_ids) <= 1 << 16 else np.uint32))
+        _save(os.path.join(path, "values.npy"), values)
+
+    def partitions(self, start=None, end=None, equipment_ids=None):
+        
+        # Yields (day, equipment_id, part path) for parts whose day overlaps [start, end).
+        start_day = None if start is None else np.datetime64(_epoch_seconds(start) // 86400, "D")
+        end_day = None if end is None else np.datetime64((_epoch_seconds(end) - 1) // 86400, "D")
+        for day_dir in sorted(os.listdir(self.root)):
+            if not day_dir.startswith("day="):
+                continue
+            day = np.datetime64(day_dir[4:], "D")
+            if (start_day is not None and day < start_day) or (end_day is not None and day > end_day):
+                continue
+            for equipment_dir in sorted(os.listdir(os.path.join(self.root, day_dir))):
+                equipment_id = equipment_dir[len("equipment="):]
+                if equipment_ids is not None and equipment_id not in equipment_ids:
+                    continue
+                directory = os.path.join(self.root, day_dir, equipment_dir)
+                for part in sorted(os.listdir(directory)):
+                    if part.startswith("part-") and not part.endswith(".tmp"):
+                        yield day, equipment_id, os.path.join(directory, part)
+
+    def scan(self, start=None, end=None, equipment_ids=None, sensor_ids=None):
+        
+        # Yields (equipment_id, timestamps datetime64[s], sensor codes, values) per part. Without a
+        # sensor filter, codes and values are read-only slices of the memory-mapped files; only the
+        # timestamp blocks overlapping the range are decoded.
+        if isinstance(equipment_ids, str):
+            equipment_ids = [equipment_ids]
+        wanted = None
+        if sensor_ids is not None:
+            sensor_ids = [sensor_ids] if isinstance(sensor_ids, str) else sensor_ids
+            wanted = np.array([self.sensor_codes[s] for s in sensor_ids if s in self.sensor_codes], dtype=np.int64)
+        lo_s = None if start is None else _epoch_seconds(start)
+        hi_s = None if end is None else _epoch_seconds(end)
+        for _, equipment_id, path in self.partitions(start, end, equipment_ids):
+            if path.endswith(".parquet"):
+                timestamps, codes, values = self._read_parquet(path)
+                first = 0 if lo_s is None else np.searchsorted(timestamps, lo_s)
+                last = len(timestamps) if hi_s is None else np.searchsorted(timestamps, hi_s)
+                timestamps, codes, values = timestamps[first:last], codes[first:last], values[first:last]
+            else:
+                timestamps, codes, values = self._read_npy_part(path, lo_s, hi_s)
+            if wanted is not None:
+                mask = np.isin(codes, wanted)
+                timestamps, codes, values = timestamps[mask], codes[mask], values[mask]
+            if len(timestamps):
+                yield equipment_id, timestamps.astype("datetime64[s]"), codes, values
+
+    def _read_npy_part(self, path, lo_s, hi_s):
+        blocks = np.load(os.path.join(path, "timestamp_blocks.npy"))
+        deltas = np.load(os.path.join(path, "timestamp_deltas.npy"), mmap_mode="r")
+        rows = len(deltas)
+        # A block starting exactly at lo_s can be preceded by one ending in that same second, so start
+        # one block before the first whose start is >= lo_s.
+        first_block = 0 if lo_s is None else max(np.searchsorted(blocks, lo_s, side="left") - 1, 0)
+        last_block = len(blocks) if hi_s is None else np.searchsorted(blocks, hi_s, side="left")
+        row_lo, row_hi = first_block * BLOCK_ROWS, min(last_block * BLOCK_ROWS, rows)
+        if row_hi <= row_lo:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint16), np.empty(0, dtype=np.float32)
+        # Each block's first delta is 0, so rebasing the running sum per block recovers absolute times.
+        running = np.cumsum(deltas[row_lo:row_hi], dtype=np.int64)
+        block_starts = np.arange(0, row_hi - row_lo, BLOCK_ROWS)
+        offsets = blocks[first_block:last_block] - running[block_starts]
+        timestamps = running + np.repeat(offsets, np.diff(np.append(block_starts, row_hi - row_lo)))
+        first = 0 if lo_s is None else np.searchsorted(timestamps, lo_s)
+        last = len(timestamps) if hi_s is None else np.searchsorted(timestamps, hi_s)
+        codes = np.load(os.path.join(path, "sensor_codes.npy"), mmap_mode="r")
+        values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        return (timestamps[first:last], codes[row_lo + first:row_lo + last].view(np.ndarray),
+                values[row_lo + first:row_lo + last].view(np.ndarray))
+
+    def _read_parquet(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Reading Parquet archives needs pyarrow (pip install pyarrow)") from exc
+        table = pq.read_table(path)
+        # Part dictionaries are snapshots of the archive dictionary, so their indices are archive codes.
+        codes = table.column("sensor_id").combine_chunks().indices.to_numpy()
+        return table.column("timestamp").to_numpy(), codes, table.column("value").to_numpy()
+
+    def query_range(self, sensor_ids, start, end):
+        
+        # Same shape as Database.query_range: {sensor_id: (datetime64[s] timestamps, float32 values)}.
+        if isinstance(sensor_ids, str):
+            sensor_ids = [sensor_ids]
+        pieces = {sensor_id: [] for sensor_id in sensor_ids}
+        for _, timestamps, codes, values in self.scan(start, end, sensor_ids=sensor_ids):
+            for sensor_id in sensor_ids:
+                mask = codes == self.sensor_codes.get(sensor_id, -1)
+                if mask.any():
+                    pieces[sensor_id].append((timestamps[mask], values[mask]))
+        series = {}
+        for sensor_id, parts in pieces.items():
+            if not parts:
+                series[sensor_id] = (np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype=np.float32))
+                continue
+            timestamps = np.concatenate([t for t, _ in parts])
+            values = np.concatenate([v for _, v in parts])
+            order = np.argsort(timestamps, kind="stable")
+            series[sensor_id] = (timestamps[order], values[order])
+        return series
+
+    def size_bytes(self):
+        
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, names in os.walk(self.root) for name in names)
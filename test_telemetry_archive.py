@@ -0,0 +1,26 @@
+import numpy as np
+
+from main import Database, _format_timestamp
+from telemetry_archive import BLOCK_ROWS, TelemetryArchive
+
+
+def test_range_starting_on_block_boundary_keeps_same_second_rows(tmp_path):
+    # Three sensors of one machine sampled in the same second: a block boundary falls between
+    # readings that share a timestamp, so the block before it still holds rows for `start`.
+    db = Database(str(tmp_path / "telemetry.db"))
+    base = 1_700_000_000
+    rows = [(f"S{i % 3}", "E1", float(i), _format_timestamp(base + i // 3)) for i in range(3 * BLOCK_ROWS)]
+    with db.connection:
+        db.cursor.executemany("INSERT INTO sensor_data (sensor_id, equipment_id, value, timestamp) VALUES (?, ?, ?, ?)", rows)
+    archive = TelemetryArchive(str(tmp_path / "archive"))
+    archive.export(db)
+
+    (_, _, part), = archive.partitions()
+    blocks = np.load(f"{part}/timestamp_blocks.npy")
+    for start in blocks[1:]:
+        start, end = int(start), int(start) + 5
+        expected = db.query_range(["S0", "S1", "S2"], start, end)
+        actual = archive.query_range(["S0", "S1", "S2"], start, end)
+        for sensor_id, (timestamps, values) in expected.items():
+            np.testing.assert_array_equal(actual[sensor_id][0], timestamps)
+            np.testing.assert_allclose(actual[sensor_id][1], values)
@@ -0,0 +1,121 @@
+import numpy as np
+
+
+class TrajectoryRecorder:
+    # Rows live in fixed-size preallocated chunks, so recording never copies earlier data.
+    # With spill_path the chunks are windows of one memory-mapped file and the OS pages
+    # them out, keeping resident memory bounded for arbitrarily long recordings.
+    def __init__(self, columns, chunk_rows=65536, dtype=np.float32, spill_path=None, column_names=None):
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.dtype = np.dtype(dtype)
+        self.spill_path = spill_path
+        self.column_names = list(column_names) if column_names is not None else [f"joint_{i}" for i in range(columns)]
+        self.chunks = []
+        self.rows = 0
+        self.current = None
+        self.current_map = None
+        self.current_rows = 0
+        if spill_path is not None:
+            open(spill_path, "wb").close()
+
+    def __len__(self):
+        return self.rows
+
+    def _new_chunk(self):
+        if self.spill_path is None:
+            chunk = np.empty((self.chunk_rows, self.columns), dtype=self.dtype)
+            self.chunks.append(chunk)
+        else:
+            if self.current_map is not None:
+                self.current_map.flush()
+            chunk_bytes = self.chunk_rows * self.columns * self.dtype.itemsize
+            offset = len(self.chunks) * chunk_bytes
+            with open(self.spill_path, "r+b") as f:
+                f.truncate(offset + chunk_bytes)
+            self.current_map = np.memmap(self.spill_path, dtype=self.dtype, mode="r+", offset=offset, shape=(self.chunk_rows, self.columns))
+            # Plain ndarray view over the same pages: memmap's subclass hooks are slow per row.
+            chunk = self.current_map.view(np.ndarray)
+            # Only the chunk count is kept for finished chunks; their pages belong to the file now.
+            self.chunks.append(None)
+        self.current = chunk
+        self.current_rows = 0
+
+    def next_row(self):
+        
+        # Writable view of the next row, e.g. JointGroup.read_positions(out=recorder.next_row()).
+        if self.current is None or self.current_rows == self.chunk_rows:
+            self._new_chunk()
+        row = self.current[self.current_rows]
+        self.current_rows += 1
+        self.rows += 1
+        return row
+
+    def append(self, values):
+        
+        self.next_row()[:] = values
+
+    def iter_chunks(self):
+        
+        if self.spill_path is not None:
+            data = self.to_array()
+            for start in range(0, self.rows, self.chunk_rows):
+                yield data[start:start + self.chunk_rows]
+            return
+        for chunk in self.chunks[:-1]:
+            yield chunk
+        if self.chunks:
+            yield self.chunks[-1][:self.current_rows]
+
+    def head(self, n=5):
+        
+        out = np.empty((min(n, self.rows), self.columns), dtype=self.dtype)
+        filled = 0
+        for chunk in self.iter_chunks():
+            if filled == len(out):
+                break
+            take = min(len(out) - filled, len(chunk))
+            out[filled:filled + take] = chunk[:take]
+            filled += take
+        return out
+
+    def to_array(self):
+        
+        # Zero-copy read-only map when spilled; otherwise one contiguous in-memory copy.
+        if self.spill_path is not None:
+            if self.current_map is not None:
+                self.current_map.flush()
+            if self.rows == 0:
+                return np.empty((0, self.columns), dtype=self.dtype)
+            return np.memmap(self.spill_path, dtype=self.dtype, mode="r", shape=(self.rows, self.columns))
+        if not self.chunks:
+            return np.empty((0, self.columns), dtype=self.dtype)
+        return np.concatenate(list(self.iter_chunks()))
+
+    def save_npy(self, path):
+        
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(self.rows, self.columns))
+        start = 0
+        for chunk in self.iter_chunks():
+            out[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        out.flush()
+        del out
+        return path
+
+    def save_parquet(self, path):
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+        schema = pa.schema([(name, pa.from_numpy_dtype(self.dtype)) for name in self.column_names])
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in self.iter_chunks():
+                writer.write_table(pa.Table.from_arrays([pa.array(chunk[:, i]) for i in range(self.columns)], schema=schema))
+        return path
+
+    def flush(self):
+        if self.current_map is not None:
+            self.current_map.flush()
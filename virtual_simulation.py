@@ -1,72 +1,66 @@
 import pybullet as p
-import time
-import pybullet_data
 import numpy as np
+from simulation_runner import JointGroup, runner_from_argv
+from trajectory_recorder import TrajectoryRecorder
+from collision_monitor import CollisionMonitor
 
-physicsClient = p.connect(p.GUI)  
-p.setGravity(0, 0, -9.8)  
+time_step = 0.01
+runner = runner_from_argv(time_step)
+client = runner.client
 
-p.setAdditionalSearchPath(pybullet_data.getDataPath())  
-planeId = p.loadURDF("plane.urdf")  
-robotId = p.loadURDF("kuka_iiwa/model.urdf", basePosition=[0, 0, 0.5])  
-conveyorId = p.loadURDF("r2d2.urdf", basePosition=[1, 0, 0.5])  
+planeId = runner.load("plane.urdf")
+robotId = runner.load("kuka_iiwa/model.urdf", [0, 0, 0.5])
+arm_joints = JointGroup(client, robotId)
+conveyorId = runner.load("r2d2.urdf", [1, 0, 0.5])
+collision_monitor = CollisionMonitor(client, [(robotId, conveyorId)])
 
+joint_positions_log = TrajectoryRecorder(len(arm_joints))
+target_positions_log = []
 
-time_step = 0.01  
-p.setTimeStep(time_step)
-p.setRealTimeSimulation(1)  
 
-joint_positions_log = []
-target_positions_log = []
+def target_joint_positions(t):
+    return [0.5 * np.sin(1 * t),
+            -1.0 * np.cos(2 * t),
+            1.0 * np.sin(3 * t),
+            -1.5 * np.cos(4 * t),
+            1.0 * np.sin(5 * t),
+            -0.5 * np.cos(6 * t),
+            0.2 * np.sin(7 * t)]
 
 
 def control_robot_arm(target_joint_positions):
-    for i in range(p.getNumJoints(robotId)):
-        p.setJointMotorControl2(robotId, i, p.POSITION_CONTROL, targetPosition=target_joint_positions[i])
+    arm_joints.set_positions(target_joint_positions)
 
 
-def control_conveyor():
-    conveyor_position = np.sin(time.time()) * 0.5  
-    p.resetBasePositionAndOrientation(conveyorId, [1, 0, 0.5 + conveyor_position], [0, 0, 0, 1])
+def control_conveyor(t):
+    conveyor_position = np.sin(t) * 0.5
+    p.resetBasePositionAndOrientation(conveyorId, [1, 0, 0.5 + conveyor_position], [0, 0, 0, 1], physicsClientId=client)
 
 
-def detect_collisions():
-    contact_points = p.getContactPoints()
-    if contact_points:
-        for contact in contact_points:
-            print(f"Collision detected: {contact}")
+def detect_collisions(t, step):
+    collision_monitor.check(step, t)
 
 def log_joint_positions():
-    joint_positions = []
-    for i in range(p.getNumJoints(robotId)):
-        joint_state = p.getJointState(robotId, i)
-        joint_positions.append(joint_state[0])
-    joint_positions_log.append(joint_positions)
-
-for step in range(5000):  
-    
-    target_joint_positions = [0.5 * np.sin(step * 0.01),  
-                              -1.0 * np.cos(step * 0.02),  
-                              1.0 * np.sin(step * 0.03),  
-                              -1.5 * np.cos(step * 0.04),  
-                              1.0 * np.sin(step * 0.05),  
-                              -0.5 * np.cos(step * 0.06),  
-                              0.2 * np.sin(step * 0.07)]  
-
-   
-    control_robot_arm(target_joint_positions)
-    control_conveyor()
+    arm_joints.read_positions(out=joint_positions_log.next_row())
+
+
+def simulation_step(t, step):
+    control_robot_arm(target_joint_positions(t))
+    control_conveyor(t)
 
     log_joint_positions()
 
-    detect_collisions()
-    
-    p.stepSimulation()
+    detect_collisions(t, step)
+
+
+runner.run(5000, simulation_step)
 
-    time.sleep(time_step)
+print(f"Collision events: {collision_monitor.summary()}")
+for event in collision_monitor.events()[:5]:
+    print(event)
 
 print("Logged joint positions during simulation:")
-for i, positions in enumerate(joint_positions_log[:5]):  
+for i, positions in enumerate(joint_positions_log.head(5).tolist()):
     print(f"Step {i}: {positions}")
 
-p.disconnect()
+runner.disconnect()